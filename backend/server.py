@@ -1,21 +1,41 @@
-from fastapi import FastAPI, APIRouter, WebSocket, WebSocketDisconnect, HTTPException, Request
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, APIRouter, WebSocket, WebSocketDisconnect, HTTPException, Request, Depends
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import AsyncMongoClient, WriteConcern
 import os
 import logging
-import json
+import logging.handlers
+import queue
+import re
+import sys
+import orjson
 import asyncio
+import time
+import hashlib
+import zlib
+import numpy as np
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
 from pathlib import Path
-from pydantic import BaseModel, Field, ConfigDict
-from typing import List, Optional, Dict, Any
+from pydantic import BaseModel, Field, ConfigDict, TypeAdapter
+from typing import List, Optional, Dict, Any, AsyncIterator, Final, Mapping
+from types import MappingProxyType
 import uuid
 from datetime import datetime, timezone
 # Note: Using direct google.genai SDK for text mode to avoid budget limits
 # from emergentintegrations.llm.chat import LlmChat, UserMessage  # Not used - replaced with direct Gemini API
 from emergentintegrations.llm.openai import OpenAIChatRealtime  # Kept for future OpenAI integration
 
+# Configure logging: records are queued on the event loop thread and written to stderr by a listener thread
+_log_handler = logging.StreamHandler()
+_log_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+_log_queue: queue.SimpleQueue = queue.SimpleQueue()
+log_listener = logging.handlers.QueueListener(_log_queue, _log_handler, respect_handler_level=True)
+logging.basicConfig(level=logging.INFO, handlers=[logging.handlers.QueueHandler(_log_queue)])
+log_listener.start()
+logger = logging.getLogger(__name__)
+
 # Import Google Gemini Live API components
 try:
     from google import genai
@@ -30,9 +50,27 @@ load_dotenv(ROOT_DIR / '.env')
 
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+# One client per process; the driver multiplexes every request over this pool
+client = AsyncMongoClient(
+    mongo_url,
+    maxPoolSize=200,
+    minPoolSize=20,
+    maxIdleTimeMS=60000,
+    waitQueueTimeoutMS=5000,
+    # Fail fast when the server is unreachable instead of holding requests for the 30s default
+    serverSelectionTimeoutMS=5000,
+    socketTimeoutMS=10000,
+    retryWrites=True,
+    compressors="zstd,zlib",
+    w=1,
+)
 db = client[os.environ['DB_NAME']]
 
+# The agent transcript can be regenerated, so its writes skip the journal; artifacts and projects are journaled
+message_writes = db.agent_messages.with_options(write_concern=WriteConcern(w=1, j=False))
+durable_artifacts = db.artifacts.with_options(write_concern=WriteConcern(w=1, j=True))
+durable_projects = db.projects.with_options(write_concern=WriteConcern(w=1, j=True))
+
 # Get API keys
 EMERGENT_LLM_KEY = os.environ.get('EMERGENT_LLM_KEY')
 GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY')
@@ -42,64 +80,346 @@ ENABLE_OPENAI_REALTIME = os.environ.get('ENABLE_OPENAI_REALTIME', 'true').lower(
 ENABLE_GEMINI_LIVE = os.environ.get('ENABLE_GEMINI_LIVE', 'false').lower() == 'true'
 REALTIME_PROVIDER = os.environ.get('REALTIME_PROVIDER', 'openai').lower()
 
+# Text-mode agent model and lifetime of its provider-side prompt caches
+TEXT_MODEL = "gemini-2.5-pro"
+PROMPT_CACHE_TTL_SECONDS = 3600
+# Caches are replaced this long before the provider expires them
+PROMPT_CACHE_REFRESH_MARGIN_SECONDS = 60
+
+# Response cache for repeated (agent, context) generations
+ENABLE_RESPONSE_CACHE = os.environ.get('ENABLE_RESPONSE_CACHE', 'true').lower() == 'true'
+RESPONSE_CACHE_MAX_ENTRIES = 512
+RESPONSE_CACHE_TTL_SECONDS = 3600
+
+# Admission control for Gemini text calls, shared by every workflow in the process
+LLM_MAX_CONCURRENCY = int(os.environ.get('LLM_MAX_CONCURRENCY', '8'))
+LLM_REQUESTS_PER_MINUTE = int(os.environ.get('LLM_REQUESTS_PER_MINUTE', '60'))
+LLM_BURST = 10
+LLM_RATE_LIMIT_RETRIES = 3
+LLM_RATE_LIMIT_BACKOFF_SECONDS = 1.0
+
+# Opt-in fallback that serves paraphrased contexts from earlier responses by embedding similarity
+ENABLE_SEMANTIC_CACHE = os.environ.get('ENABLE_SEMANTIC_CACHE', 'false').lower() == 'true'
+SEMANTIC_CACHE_THRESHOLD = float(os.environ.get('SEMANTIC_CACHE_THRESHOLD', '0.92'))
+SEMANTIC_CACHE_MAX_ENTRIES = 256
+EMBEDDING_MODEL = "gemini-embedding-001"
+
+# Start the Business Analyst on the brief alone (and the UX Designer on that draft) while the Project Manager is still planning
+ENABLE_SPECULATIVE_BA = os.environ.get('ENABLE_SPECULATIVE_BA', 'true').lower() == 'true'
+
+# Upper bound on frames coalesced into one workflow WebSocket message
+WS_BATCH_MAX_FRAMES = 32
+# How long the writer holds a token frame open for more frames to join its batch
+WS_BATCH_LINGER_SECONDS = 0.005
+
+# Workflow WebSocket flow control: bounded outbound queue, keepalive interval and overall workflow deadline
+WS_QUEUE_MAX_FRAMES = 256
+WS_HEARTBEAT_SECONDS = 15
+WORKFLOW_TIMEOUT_SECONDS = 300
+
+# Artifacts larger than this are sent as binary chunks of zlib-compressed UTF-8 between artifact_begin/artifact_end frames
+ARTIFACT_CHUNK_THRESHOLD = 32 * 1024
+ARTIFACT_CHUNK_SIZE = 16 * 1024
+ARTIFACT_COMPRESSION_LEVEL = 6
+
+# Optional append-only JSONL log of artifacts saved after the HTTP response; replayed into MongoDB at startup
+ARTIFACT_WAL_PATH = os.environ.get('ARTIFACT_WAL_PATH')
+
+# Upper bound on rows returned by the list endpoints, and the cursor batch size used to fetch them
+MAX_LIST_RESULTS = 1000
+LIST_BATCH_SIZE = 200
+
 # Create the main app
+# uvicorn's default loop="auto"/http="auto" pick uvloop and httptools when installed (see requirements.txt)
 app = FastAPI()
 api_router = APIRouter(prefix="/api")
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
-logger = logging.getLogger(__name__)
-
 # ==================== MODELS ====================
 
+_uuid4 = uuid.uuid4
+_now = datetime.now
+
+def new_id() -> str:
+    return _uuid4().hex
+
+def utc_now() -> datetime:
+    return _now(timezone.utc)
+
 class Project(BaseModel):
-    model_config = ConfigDict(extra="ignore")
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    model_config = ConfigDict(extra="ignore", frozen=True)
+    id: str = Field(default_factory=new_id)
     name: str
     description: str
     mode: str
     status: str = "active"
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
-    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    created_at: datetime = Field(default_factory=utc_now)
+    updated_at: datetime = Field(default_factory=utc_now)
 
 class Artifact(BaseModel):
-    model_config = ConfigDict(extra="ignore")
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    model_config = ConfigDict(extra="ignore", frozen=True)
+    id: str = Field(default_factory=new_id)
     project_id: str
     artifact_type: str
     content: str
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    created_at: datetime = Field(default_factory=utc_now)
 
 class AgentMessage(BaseModel):
-    model_config = ConfigDict(extra="ignore")
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    model_config = ConfigDict(extra="ignore", frozen=True)
+    id: str = Field(default_factory=new_id)
     project_id: str
     agent_role: str
     message: str
     message_type: str = "text"
-    timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    timestamp: datetime = Field(default_factory=utc_now)
 
 class ProjectCreate(BaseModel):
+    model_config = ConfigDict(frozen=True)
     name: str
     description: str
     mode: str = "text"
 
-# ==================== ENHANCED AGENT SYSTEM ====================
+# Built once so list responses are validated and serialized in a single pydantic-core pass
+PROJECT_ADAPTER = TypeAdapter(Project)
+PROJECT_LIST_ADAPTER = TypeAdapter(List[Project])
+ARTIFACT_LIST_ADAPTER = TypeAdapter(List[Artifact])
+MESSAGE_LIST_ADAPTER = TypeAdapter(List[AgentMessage])
 
-class EnhancedAgentOrchestrator:
-    """Enhanced multi-agent orchestrator with better prompts and React generation"""
+def model_projection(model: type[BaseModel]) -> Dict[str, int]:
+    """Fetch only the fields a response model keeps; anything else would be transferred and then dropped"""
+    return {"_id": 0, **{name: 1 for name in model.model_fields}}
+
+PROJECT_PROJECTION = model_projection(Project)
+ARTIFACT_PROJECTION = model_projection(Artifact)
+MESSAGE_PROJECTION = model_projection(AgentMessage)
+
+def validated_json(adapter: TypeAdapter, data: Any) -> Response:
+    """Validate and encode with a prebuilt adapter; returning a Response skips FastAPI's response_model pass"""
+    return Response(content=adapter.dump_json(adapter.validate_python(data)), media_type="application/json")
+
+# ==================== RESPONSE CACHE ====================
+
+def prompt_digest(system_prompt: str) -> str:
+    """Stable id for a (model, system prompt) pair; cache entries are scoped to it"""
+    return hashlib.blake2b(f"{TEXT_MODEL}|{system_prompt}".encode(), digest_size=16).hexdigest()
+
+class ResponseCache:
+    """In-process LRU+TTL cache of agent responses, mirrored to MongoDB so it survives restarts"""
     
-    def __init__(self, api_key: str):
-        self.api_key = api_key
-        # Initialize direct Gemini client
-        self.gemini_client = genai.Client(api_key=api_key)
-        self.agents = {
-            "pm": {
-                "name": "Alex (Project Manager)",
-                "system_prompt": """You are Alex, a visionary Project Manager with 15+ years in software design.
+    def __init__(self, max_entries: int, ttl_seconds: int):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._pending: set = set()
+    
+    @staticmethod
+    def key(agent_role: str, prompt_hash: str, context: str) -> str:
+        return hashlib.blake2b(f"{agent_role}|{prompt_hash}|{context}".encode(), digest_size=16).hexdigest()
+    
+    async def get(self, key: str) -> Optional[str]:
+        entry = self.entries.get(key)
+        if entry and entry[0] > time.monotonic():
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+        
+        # Fall back to the persisted copy; MongoDB's TTL index removes expired documents
+        doc = await db.response_cache.find_one({"key": key}, {"_id": 0, "response": 1})
+        if doc:
+            self._remember(key, doc["response"])
+            self.hits += 1
+            return doc["response"]
+        
+        self.misses += 1
+        return None
+    
+    def put(self, key: str, agent_role: str, response: str):
+        self._remember(key, response)
+        task = asyncio.create_task(db.response_cache.update_one(
+            {"key": key},
+            {"$set": {"key": key, "agent_role": agent_role, "response": response,
+                      "created_at": utc_now()}},
+            upsert=True
+        ))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+    
+    def _remember(self, key: str, response: str):
+        self.entries[key] = (time.monotonic() + self.ttl_seconds, response)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+class SemanticCache:
+    """Per-agent nearest-neighbour cache of responses over context embeddings, persisted in MongoDB
+    
+    Only consulted after an exact ResponseCache miss. Entries are scoped to the
+    model and system prompt that produced them, so prompt edits invalidate them.
+    """
+    
+    def __init__(self, gemini_client: "genai.Client", threshold: float, max_entries: int):
+        self.gemini_client = gemini_client
+        self.threshold = threshold
+        self.max_entries = max_entries
+        # role -> (unit-normalised embeddings, responses), loaded from MongoDB on first use
+        self.entries: Dict[str, tuple[Optional[np.ndarray], List[str]]] = {}
+        self.hits = 0
+        self._pending: set = set()
+    
+    async def embed(self, context: str) -> Optional[np.ndarray]:
+        try:
+            result = await self.gemini_client.aio.models.embed_content(model=EMBEDDING_MODEL, contents=context)
+        except Exception as e:
+            logger.warning(f"Embedding failed, skipping semantic cache: {str(e)}")
+            return None
+        vector = np.asarray(result.embeddings[0].values, dtype=np.float32)
+        return vector / (np.linalg.norm(vector) or 1.0)
+    
+    async def lookup(self, agent_role: str, scope: str, embedding: np.ndarray) -> Optional[str]:
+        if agent_role not in self.entries:
+            await self._load(agent_role, scope)
+        matrix, responses = self.entries[agent_role]
+        if not responses:
+            return None
+        scores = matrix @ embedding
+        best = int(scores.argmax())
+        if scores[best] < self.threshold:
+            return None
+        self.hits += 1
+        return responses[best]
+    
+    def put(self, agent_role: str, scope: str, embedding: np.ndarray, response: str):
+        matrix, responses = self.entries.get(agent_role, (None, []))
+        matrix = np.vstack([matrix, embedding]) if responses else embedding[np.newaxis, :]
+        matrix = matrix[-self.max_entries:]
+        responses = (responses + [response])[-self.max_entries:]
+        self.entries[agent_role] = (matrix, responses)
+        task = asyncio.create_task(db.semantic_cache.insert_one({
+            "agent_role": agent_role,
+            "scope": scope,
+            "embedding": embedding.tolist(),
+            "response": response,
+            "created_at": utc_now()
+        }))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+    
+    async def _load(self, agent_role: str, scope: str):
+        cursor = db.semantic_cache.find(
+            {"agent_role": agent_role, "scope": scope}, {"_id": 0, "embedding": 1, "response": 1}
+        ).sort("created_at", -1).limit(self.max_entries)
+        docs = [doc async for doc in cursor][::-1]
+        matrix = np.asarray([doc["embedding"] for doc in docs], dtype=np.float32) if docs else None
+        self.entries[agent_role] = (matrix, [doc["response"] for doc in docs])
+
+# ==================== LLM SCHEDULING ====================
+
+class TokenBucket:
+    """Request-rate limiter: refills `rate` tokens per second up to `capacity`; waiters are served in order"""
+    
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+    
+    async def take(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+class AgentScheduler:
+    """Bounds in-flight Gemini calls with two priority lanes and an AIMD concurrency limit
+    
+    Interactive calls (workflow stages the user is watching) are admitted before
+    background ones (speculative drafts, artifact generation). The limit grows by
+    about one slot per limit's worth of successes and halves on every 429.
+    """
+    
+    INTERACTIVE = 0
+    BACKGROUND = 1
+    
+    def __init__(self, max_concurrency: int, bucket: TokenBucket):
+        self.max_concurrency = max_concurrency
+        self.limit = float(max_concurrency)
+        self.active = 0
+        self.lanes: tuple[deque, deque] = (deque(), deque())
+        self.bucket = bucket
+    
+    @asynccontextmanager
+    async def slot(self, priority: int):
+        await self._enter(priority)
+        try:
+            await self.bucket.take()
+            yield
+        finally:
+            self._leave()
+    
+    async def _enter(self, priority: int):
+        if self.active < int(self.limit) and not any(self.lanes):
+            self.active += 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self.lanes[priority].append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.cancelled():
+                if waiter in self.lanes[priority]:
+                    self.lanes[priority].remove(waiter)
+            else:
+                # The slot was handed over just as we were cancelled; pass it on
+                self._leave()
+            raise
+    
+    def _leave(self):
+        self.active -= 1
+        self._wake()
+    
+    def _wake(self):
+        for lane in self.lanes:
+            while lane and self.active < int(self.limit):
+                waiter = lane.popleft()
+                if not waiter.done():
+                    self.active += 1
+                    waiter.set_result(None)
+    
+    def on_success(self):
+        self.limit = min(float(self.max_concurrency), self.limit + 1 / self.limit)
+        self._wake()
+    
+    def on_rate_limited(self):
+        self.limit = max(1.0, self.limit / 2)
+        logger.warning(f"Gemini rate limit hit; LLM concurrency limit lowered to {int(self.limit)}")
+
+def _is_rate_limited(error: Exception) -> bool:
+    return getattr(error, "code", None) == 429
+
+# ==================== ENHANCED AGENT SYSTEM ====================
+
+# Opening ```lang fence around generated code; anchored with match() so only the start of the text is examined
+_OPEN_FENCE_RE = re.compile(r"```[\w+-]*[ \t]*\n?")
+
+def _strip_fences(text: str) -> str:
+    text = text.strip()
+    opening = _OPEN_FENCE_RE.match(text)
+    if opening:
+        text = text[opening.end():]
+    return text.removesuffix("```").strip()
+
+# Signals that the PM's plan changes the brief's scope, invalidating a speculative BA draft
+_SCOPE_CHANGE_RE = re.compile(r"\b(revis(?:e|ed|ing)|re-?scop(?:e|ed|ing)|scope change|pivot|instead of)\b", re.IGNORECASE)
+
+# Agent personas are module constants, so every orchestrator (and every forked worker) shares one copy
+PM_PROMPT: Final[str] = sys.intern("""You are Alex, a visionary Project Manager with 15+ years in software design.
 
 Your approach:
 1. Deeply analyze the project brief to understand user needs and business goals
@@ -109,11 +429,9 @@ Your approach:
 5. Highlight potential challenges and mitigation strategies
 
 Your response should be structured, professional, and inspire confidence.
-End by confirming handoff to the Business Analyst."""
-            },
-            "ba": {
-                "name": "Brenda (Business Analyst)",
-                "system_prompt": """You are Brenda, a senior Business Analyst specializing in product strategy.
+End by confirming handoff to the Business Analyst.""")
+
+BA_PROMPT: Final[str] = sys.intern("""You are Brenda, a senior Business Analyst specializing in product strategy.
 
 Create a comprehensive Vision Document with this EXACT structure:
 
@@ -164,11 +482,9 @@ Create a comprehensive Vision Document with this EXACT structure:
 ## Competitive Advantage
 [What makes this unique]
 
-Be thorough, specific, and business-focused. End by confirming handoff to UX Designer."""
-            },
-            "ux": {
-                "name": "Carlos (UX Designer)",
-                "system_prompt": """You are Carlos, an expert UX Designer with deep expertise in user-centered design.
+Be thorough, specific, and business-focused. End by confirming handoff to UX Designer.""")
+
+UX_PROMPT: Final[str] = sys.intern("""You are Carlos, an expert UX Designer with deep expertise in user-centered design.
 
 Create comprehensive Use Cases with this EXACT structure:
 
@@ -218,11 +534,9 @@ Create comprehensive Use Cases with this EXACT structure:
 ## Accessibility Considerations
 [How to ensure accessible design]
 
-Be detailed, user-focused, and practical. End by confirming handoff to UI Engineer."""
-            },
-            "ui": {
-                "name": "Diana (UI Engineer)",
-                "system_prompt": """You are Diana, a senior UI Engineer specializing in modern React development.
+Be detailed, user-focused, and practical. End by confirming handoff to UI Engineer.""")
+
+UI_PROMPT: Final[str] = sys.intern("""You are Diana, a senior UI Engineer specializing in modern React development.
 
 Your task: Create a COMPLETE, PRODUCTION-READY React application based on the vision and use cases.
 
@@ -272,71 +586,252 @@ KEY POINTS:
 
 IMPORTANT: Your ENTIRE response must be ONLY the JavaScript/React code. No markdown, no explanations, just the code starting with "import React".
 
-Create a visually stunning, fully functional React application."""
-            }
-        }
+Create a visually stunning, fully functional React application.""")
+
+# Prompt digests are computed once at import so cache keys never rehash the full prompt
+AGENTS: Final[Mapping[str, Mapping[str, str]]] = MappingProxyType({
+    role: MappingProxyType({"name": name, "system_prompt": prompt, "prompt_hash": prompt_digest(prompt)})
+    for role, name, prompt in (
+        ("pm", "Alex (Project Manager)", PM_PROMPT),
+        ("ba", "Brenda (Business Analyst)", BA_PROMPT),
+        ("ux", "Carlos (UX Designer)", UX_PROMPT),
+        ("ui", "Diana (UI Engineer)", UI_PROMPT),
+    )
+})
+
+def ux_context(initial_brief: str, ba_response: str) -> str:
+    return f"Project Brief: {initial_brief}\n\nVision Document:\n{ba_response}"
+
+class EnhancedAgentOrchestrator:
+    """Enhanced multi-agent orchestrator with better prompts and React generation"""
+    
+    def __init__(self, api_key: str):
+        self.api_key = api_key
+        # Initialize direct Gemini client
+        self.gemini_client = genai.Client(api_key=api_key)
+        # Reusable generation config per agent, bound to the Gemini cache of its system prompt: role -> (config, refresh_at)
+        self.prompt_caches: Dict[str, tuple["types.GenerateContentConfig", float]] = {}
+        # One lock per agent, so a cold start or refresh only waits on that agent's own caches.create call
+        self.prompt_cache_locks: Dict[str, asyncio.Lock] = {role: asyncio.Lock() for role in AGENTS}
+        self.cache_stats = {"prompt_tokens": 0, "cached_tokens": 0}
+        self.response_cache = ResponseCache(RESPONSE_CACHE_MAX_ENTRIES, RESPONSE_CACHE_TTL_SECONDS)
+        self.scheduler = AgentScheduler(
+            LLM_MAX_CONCURRENCY, TokenBucket(LLM_REQUESTS_PER_MINUTE / 60, LLM_BURST)
+        )
+        self.semantic_cache = SemanticCache(self.gemini_client, SEMANTIC_CACHE_THRESHOLD, SEMANTIC_CACHE_MAX_ENTRIES)
+        self.pending_saves: set = set()
+        # Artifacts whose background insert failed; flush_saves() keeps them in the WAL for the next replay
+        self.failed_saves: List[dict] = []
+        self.cache_warmer: Optional[asyncio.Task] = None
+        self.agents = AGENTS
+    
+    async def get_generation_config(self, agent_role: str) -> "types.GenerateContentConfig":
+        """Return the reusable generation config for an agent, creating its prompt cache on first use"""
+        async with self.prompt_cache_locks[agent_role]:
+            entry = self.prompt_caches.get(agent_role)
+            if entry and entry[1] > time.monotonic():
+                return entry[0]
+            return await self._refresh_prompt_cache(agent_role)
+    
+    async def _refresh_prompt_cache(self, agent_role: str) -> "types.GenerateContentConfig":
+        try:
+            cache = await self.gemini_client.aio.caches.create(
+                model=TEXT_MODEL,
+                config=types.CreateCachedContentConfig(
+                    system_instruction=self.agents[agent_role]["system_prompt"],
+                    ttl=f"{PROMPT_CACHE_TTL_SECONDS}s"
+                )
+            )
+            cache_name = cache.name
+        except Exception as e:
+            # Prompts below the provider's minimum cacheable size are sent inline instead
+            logger.warning(f"Prompt cache unavailable for {agent_role}: {str(e)}")
+            cache_name = None
+        
+        # The system prompt is a fixed prefix, so it is served from cache when one exists
+        if cache_name:
+            config = types.GenerateContentConfig(cached_content=cache_name)
+        else:
+            config = types.GenerateContentConfig(system_instruction=self.agents[agent_role]["system_prompt"])
+        
+        # Failures are retried on the same schedule as a normal refresh
+        refresh_at = time.monotonic() + PROMPT_CACHE_TTL_SECONDS - PROMPT_CACHE_REFRESH_MARGIN_SECONDS
+        self.prompt_caches[agent_role] = (config, refresh_at)
+        return config
+    
+    async def keep_prompt_caches_warm(self):
+        """Create every agent's prompt cache at startup and replace it before it expires, off the request path"""
+        while True:
+            for agent_role in self.agents:
+                async with self.prompt_cache_locks[agent_role]:
+                    await self._refresh_prompt_cache(agent_role)
+            await asyncio.sleep(PROMPT_CACHE_TTL_SECONDS - 2 * PROMPT_CACHE_REFRESH_MARGIN_SECONDS)
     
-    async def run_agent(self, agent_role: str, context: str, project_id: str) -> tuple[str, str]:
-        """Run a specific agent and return its response using direct Gemini API"""
+    def prompt_cache_hit_rate(self) -> float:
+        """Fraction of prompt tokens served from provider-side caches since startup"""
+        prompt_tokens = self.cache_stats["prompt_tokens"]
+        return self.cache_stats["cached_tokens"] / prompt_tokens if prompt_tokens else 0.0
+    
+    async def stream_agent(self, agent_role: str, context: str, project_id: str,
+                           priority: int = AgentScheduler.INTERACTIVE) -> AsyncIterator[str]:
+        """Run a specific agent and yield its response text as Gemini streams it"""
         agent_info = self.agents[agent_role]
         
-        # Use direct Gemini API instead of emergentintegrations
+        cache_key = None
+        if ENABLE_RESPONSE_CACHE:
+            cache_key = ResponseCache.key(agent_role, agent_info["prompt_hash"], context)
+            cached = await self.response_cache.get(cache_key)
+            if cached is not None:
+                yield cached
+                return
+        
+        embedding = None
+        if ENABLE_SEMANTIC_CACHE:
+            scope = agent_info["prompt_hash"]
+            embedding = await self.semantic_cache.embed(context)
+            if embedding is not None:
+                similar = await self.semantic_cache.lookup(agent_role, scope, embedding)
+                if similar is not None:
+                    if cache_key:
+                        self.response_cache.put(cache_key, agent_role, similar)
+                    yield similar
+                    return
+        
         try:
-            # Prepare the conversation with system prompt and user message
+            config = await self.get_generation_config(agent_role)
             contents = [
-                {"role": "user", "parts": [{"text": f"{agent_info['system_prompt']}\n\n{context}"}]}
+                {"role": "user", "parts": [{"text": context}]}
             ]
             
-            # Make streaming request to Gemini 2.5 Pro
-            response_stream = self.gemini_client.models.generate_content_stream(
-                model="gemini-2.5-pro",
-                contents=contents
-            )
-            
-            # Collect the full response
-            full_response = ""
-            for chunk in response_stream:
-                if hasattr(chunk, 'text'):
-                    full_response += chunk.text
+            usage = None
+            chunks = []
+            for attempt in range(LLM_RATE_LIMIT_RETRIES + 1):
+                try:
+                    async with self.scheduler.slot(priority):
+                        # Use the async client so generation never blocks the event loop
+                        response_stream = await self.gemini_client.aio.models.generate_content_stream(
+                            model=TEXT_MODEL,
+                            contents=contents,
+                            config=config
+                        )
+                        async for chunk in response_stream:
+                            if chunk.usage_metadata:
+                                usage = chunk.usage_metadata
+                            if chunk.text:
+                                chunks.append(chunk.text)
+                                yield chunk.text
+                    self.scheduler.on_success()
+                    break
+                except Exception as e:
+                    if not _is_rate_limited(e):
+                        raise
+                    self.scheduler.on_rate_limited()
+                    # Retry only while nothing has been streamed out yet
+                    if chunks or attempt == LLM_RATE_LIMIT_RETRIES:
+                        raise
+                    await asyncio.sleep(LLM_RATE_LIMIT_BACKOFF_SECONDS * 2 ** attempt)
             
-            return agent_info["name"], full_response
+            if cache_key:
+                self.response_cache.put(cache_key, agent_role, "".join(chunks))
+            if embedding is not None:
+                self.semantic_cache.put(agent_role, scope, embedding, "".join(chunks))
+            if usage:
+                self.cache_stats["prompt_tokens"] += usage.prompt_token_count or 0
+                self.cache_stats["cached_tokens"] += usage.cached_content_token_count or 0
             
         except Exception as e:
-            logger.error(f"Error in run_agent for {agent_role}: {str(e)}")
+            logger.error(f"Error in stream_agent for {agent_role}: {str(e)}")
             raise
     
-    async def process_workflow(self, project_id: str, initial_brief: str, websocket: WebSocket):
+    async def run_agent(self, agent_role: str, context: str, project_id: str,
+                        priority: int = AgentScheduler.INTERACTIVE) -> tuple[str, str]:
+        """Run a specific agent and return its full response using direct Gemini API"""
+        chunks = [delta async for delta in self.stream_agent(agent_role, context, project_id, priority)]
+        return self.agents[agent_role]["name"], "".join(chunks)
+    
+    async def run_stage(self, channel: "WorkflowChannel", agent_role: str, context: str, project_id: str) -> tuple[str, str]:
+        """Run an agent, forwarding each token over the WebSocket as it arrives"""
+        chunks = []
+        async for delta in self.stream_agent(agent_role, context, project_id):
+            chunks.append(delta)
+            await self.send_token(channel, agent_role, delta)
+        return self.agents[agent_role]["name"], "".join(chunks)
+    
+    async def run_speculated_stage(self, channel: "WorkflowChannel", agent_role: str, speculative: Optional[asyncio.Task],
+                                   context: str, project_id: str) -> tuple[str, str, bool]:
+        """Use an accepted speculative run's result, or stream the stage normally; the flag reports which"""
+        if speculative:
+            try:
+                agent_name, response = await speculative
+                await self.send_token(channel, agent_role, response)
+                return agent_name, response, True
+            except Exception as e:
+                logger.warning(f"Speculative {agent_role} run failed, re-running it in sequence: {str(e)}")
+        
+        agent_name, response = await self.run_stage(channel, agent_role, context, project_id)
+        return agent_name, response, False
+    
+    async def speculate_ux(self, ba_speculative: asyncio.Task, initial_brief: str, project_id: str) -> tuple[str, str]:
+        # Shielded so discarding the UX draft never cancels the BA draft it builds on
+        _, ba_response = await asyncio.shield(ba_speculative)
+        return await self.run_agent("ux", ux_context(initial_brief, ba_response), project_id, AgentScheduler.BACKGROUND)
+    
+    async def process_workflow(self, project_id: str, initial_brief: str, channel: "WorkflowChannel"):
         """Process the entire multi-agent workflow"""
+        # Each stage's DB writes run in the background so the next LLM call starts immediately
+        pending_writes: List[asyncio.Task] = []
+        # Speculative drafts: BA from the brief alone, and UX chained on that BA draft
+        ba_speculative: Optional[asyncio.Task] = None
+        ux_speculative: Optional[asyncio.Task] = None
+        if ENABLE_SPECULATIVE_BA:
+            ba_speculative = asyncio.create_task(
+                self.run_agent("ba", f"Project Brief: {initial_brief}", project_id, AgentScheduler.BACKGROUND)
+            )
+            ux_speculative = asyncio.create_task(self.speculate_ux(ba_speculative, initial_brief, project_id))
+        drafts = [task for task in (ba_speculative, ux_speculative) if task]
         try:
             # Stage 1: Project Manager
-            await self.send_status(websocket, "pm", "in_progress")
-            pm_name, pm_response = await self.run_agent("pm", f"Project Brief: {initial_brief}", project_id)
-            await self.send_message(websocket, project_id, "pm", pm_name, pm_response)
-            await self.send_status(websocket, "pm", "completed")
-            await self.send_handoff(websocket, "pm", "ba")
+            await self.send_status(channel, "pm", "in_progress")
+            pm_name, pm_response = await self.run_stage(channel, "pm", f"Project Brief: {initial_brief}", project_id)
+            pm_msg = await self.send_message(channel, project_id, "pm", pm_name, pm_response, utc_now())
+            pending_writes.append(asyncio.create_task(self.save_stage([pm_msg])))
             
             # Stage 2: Business Analyst
-            await self.send_status(websocket, "ba", "in_progress")
+            await self.send_transition(channel, "pm", "ba")
+            # The drafts stand unless the PM's plan changed the brief's scope
+            if _SCOPE_CHANGE_RE.search(pm_response):
+                for task in (ba_speculative, ux_speculative):
+                    if task:
+                        task.cancel()
+                ba_speculative = ux_speculative = None
             ba_context = f"Project Brief: {initial_brief}\n\nProject Manager's Plan:\n{pm_response}"
-            ba_name, ba_response = await self.run_agent("ba", ba_context, project_id)
-            await self.send_message(websocket, project_id, "ba", ba_name, ba_response)
-            await self.save_artifact(project_id, "vision", ba_response)
-            await self.send_artifact(websocket, project_id, "vision", ba_response)
-            await self.send_status(websocket, "ba", "completed")
-            await self.send_handoff(websocket, "ba", "ux")
+            ba_name, ba_response, ba_speculated = await self.run_speculated_stage(
+                channel, "ba", ba_speculative, ba_context, project_id
+            )
+            stamp = utc_now()
+            ba_msg = await self.send_message(channel, project_id, "ba", ba_name, ba_response, stamp)
+            await self.send_artifact(channel, project_id, "vision", ba_response)
+            pending_writes.append(asyncio.create_task(self.save_stage(
+                [ba_msg], [self.artifact_doc(project_id, "vision", ba_response, stamp)]
+            )))
             
             # Stage 3: UX Designer
-            await self.send_status(websocket, "ux", "in_progress")
-            ux_context = f"Project Brief: {initial_brief}\n\nVision Document:\n{ba_response}"
-            ux_name, ux_response = await self.run_agent("ux", ux_context, project_id)
-            await self.send_message(websocket, project_id, "ux", ux_name, ux_response)
-            await self.save_artifact(project_id, "usecases", ux_response)
-            await self.send_artifact(websocket, project_id, "usecases", ux_response)
-            await self.send_status(websocket, "ux", "completed")
-            await self.send_handoff(websocket, "ux", "ui")
+            await self.send_transition(channel, "ba", "ux")
+            if not ba_speculated and ux_speculative:
+                ux_speculative.cancel()
+                ux_speculative = None
+            ux_name, ux_response, _ = await self.run_speculated_stage(
+                channel, "ux", ux_speculative, ux_context(initial_brief, ba_response), project_id
+            )
+            stamp = utc_now()
+            ux_msg = await self.send_message(channel, project_id, "ux", ux_name, ux_response, stamp)
+            await self.send_artifact(channel, project_id, "usecases", ux_response)
+            pending_writes.append(asyncio.create_task(self.save_stage(
+                [ux_msg], [self.artifact_doc(project_id, "usecases", ux_response, stamp)]
+            )))
             
             # Stage 4: UI Engineer - React Component
-            await self.send_status(websocket, "ui", "in_progress")
+            await self.send_transition(channel, "ux", "ui")
             ui_context = f"""Project Brief: {initial_brief}
 
 Vision Document:
@@ -346,85 +841,310 @@ Use Cases:
 {ux_response}
 
 Create a complete React application based on all of the above. Remember: ONLY output the React code, nothing else."""
-            ui_name, ui_response = await self.run_agent("ui", ui_context, project_id)
+            ui_name, ui_response = await self.run_stage(channel, "ui", ui_context, project_id)
             
             # Clean React code
-            react_code = ui_response.strip()
-            if react_code.startswith("```javascript") or react_code.startswith("```jsx"):
-                react_code = react_code.split("\n", 1)[1]
-            if react_code.startswith("```"):
-                react_code = react_code.split("\n", 1)[1]
-            if react_code.endswith("```"):
-                react_code = react_code.rsplit("\n", 1)[0]
-            react_code = react_code.strip()
+            react_code = _strip_fences(ui_response)
             
-            await self.save_artifact(project_id, "prototype", react_code)
-            await self.send_artifact(websocket, project_id, "prototype", react_code)
-            await self.send_message(websocket, project_id, "ui", ui_name, "React prototype created successfully!")
-            await self.send_status(websocket, "ui", "completed")
+            stamp = utc_now()
+            await self.send_artifact(channel, project_id, "prototype", react_code)
+            ui_msg = await self.send_message(channel, project_id, "ui", ui_name, "React prototype created successfully!", stamp)
+            pending_writes.append(asyncio.create_task(self.save_stage(
+                [ui_msg], [self.artifact_doc(project_id, "prototype", react_code, stamp)]
+            )))
+            await self.send_status(channel, "ui", "completed")
             
-            await websocket.send_json({
+            await channel.send({
                 "type": "workflow_complete",
                 "project_id": project_id
             })
             
         except Exception as e:
             logger.error(f"Error in workflow: {str(e)}")
-            await websocket.send_json({
+            await channel.send({
                 "type": "error",
                 "message": str(e)
             })
+        finally:
+            for task in drafts:
+                if not task.done():
+                    task.cancel()
+                elif not task.cancelled():
+                    task.exception()  # discarded drafts may have failed; mark the error as seen
+            for result in await asyncio.gather(*pending_writes, return_exceptions=True):
+                if isinstance(result, Exception):
+                    logger.error(f"Error persisting workflow output for {project_id}: {str(result)}")
+    
+    def cache_summary(self) -> dict:
+        return {
+            "prompt_cache_hit_rate": round(self.prompt_cache_hit_rate(), 3),
+            "response_cache_hits": self.response_cache.hits
+        }
     
-    async def send_status(self, websocket: WebSocket, agent_role: str, status: str):
-        await websocket.send_json({
+    async def send_status(self, channel: "WorkflowChannel", agent_role: str, status: str):
+        frame = {
             "type": "agent_status",
             "agent_role": agent_role,
             "status": status
+        }
+        if status == "completed":
+            frame.update(self.cache_summary())
+        await channel.send(frame)
+    
+    async def send_transition(self, channel: "WorkflowChannel", from_agent: str, to_agent: str):
+        """One frame for "from_agent completed, handed off, to_agent in progress" between stages"""
+        await channel.send({
+            "type": "stage_transition",
+            "from": from_agent,
+            "to": to_agent,
+            "from_status": "completed",
+            "to_status": "in_progress",
+            **self.cache_summary()
         })
     
-    async def send_message(self, websocket: WebSocket, project_id: str, agent_role: str, agent_name: str, message: str):
-        msg_doc = {
-            "id": str(uuid.uuid4()),
-            "project_id": project_id,
+    async def send_token(self, channel: "WorkflowChannel", agent_role: str, delta: str):
+        await channel.send({
+            "type": "agent_token",
             "agent_role": agent_role,
-            "agent_name": agent_name,
-            "message": message,
-            "message_type": "text",
-            "timestamp": datetime.now(timezone.utc).isoformat()
-        }
-        await db.agent_messages.insert_one(msg_doc)
-        
-        await websocket.send_json({
+            "delta": delta
+        })
+    
+    async def send_message(self, channel: "WorkflowChannel", project_id: str, agent_role: str, agent_name: str, message: str,
+                           stamp: Optional[datetime] = None) -> dict:
+        """Send a completed agent message and return its document for the stage's batched write"""
+        await channel.send({
             "type": "agent_message",
             "agent_role": agent_role,
             "agent_name": agent_name,
             "message": message
         })
+        
+        return {
+            "id": new_id(),
+            "project_id": project_id,
+            "agent_role": agent_role,
+            "agent_name": agent_name,
+            "message": message,
+            "message_type": "text",
+            "timestamp": stamp or utc_now()
+        }
     
-    async def send_handoff(self, websocket: WebSocket, from_agent: str, to_agent: str):
-        await websocket.send_json({
-            "type": "handoff",
-            "from_agent": from_agent,
-            "to_agent": to_agent
-        })
-    
-    async def send_artifact(self, websocket: WebSocket, project_id: str, artifact_type: str, content: str):
-        await websocket.send_json({
-            "type": "artifact_ready",
+    async def send_artifact(self, channel: "WorkflowChannel", project_id: str, artifact_type: str, content: str):
+        if len(content) <= ARTIFACT_CHUNK_THRESHOLD:
+            await channel.send({
+                "type": "artifact_ready",
+                "project_id": project_id,
+                "artifact_type": artifact_type,
+                "content": content
+            })
+            return
+        
+        # Large artifacts skip JSON escaping and are compressed here, so small frames never pay for deflate;
+        # the client joins the chunks, inflates them and decodes UTF-8
+        data = zlib.compress(content.encode(), ARTIFACT_COMPRESSION_LEVEL)
+        await channel.send({
+            "type": "artifact_begin",
             "project_id": project_id,
             "artifact_type": artifact_type,
-            "content": content
+            "encoding": "deflate",
+            "total": len(data)
+        })
+        for offset in range(0, len(data), ARTIFACT_CHUNK_SIZE):
+            await channel.send(data[offset:offset + ARTIFACT_CHUNK_SIZE])
+        await channel.send({
+            "type": "artifact_end",
+            "project_id": project_id,
+            "artifact_type": artifact_type
         })
     
-    async def save_artifact(self, project_id: str, artifact_type: str, content: str):
-        artifact_doc = {
-            "id": str(uuid.uuid4()),
+    def artifact_doc(self, project_id: str, artifact_type: str, content: str, stamp: Optional[datetime] = None) -> dict:
+        return {
+            "id": new_id(),
             "project_id": project_id,
             "artifact_type": artifact_type,
             "content": content,
-            "created_at": datetime.now(timezone.utc).isoformat()
+            "created_at": stamp or utc_now()
         }
-        await db.artifacts.insert_one(artifact_doc)
+    
+    async def save_stage(self, messages: List[dict], artifacts: Optional[List[dict]] = None):
+        """Persist one stage's output with a single round-trip per collection; empty batches are skipped"""
+        writes = []
+        if messages:
+            writes.append(message_writes.insert_many(messages, ordered=False))
+        if artifacts:
+            writes.append(durable_artifacts.insert_many(artifacts, ordered=False))
+        await asyncio.gather(*writes)
+    
+    def save_artifact_later(self, project_id: str, artifact_type: str, content: str, stamp: Optional[datetime] = None):
+        """Persist an artifact without holding up the caller; flush_saves() waits for any still in flight"""
+        task = asyncio.create_task(self._write_behind(self.artifact_doc(project_id, artifact_type, content, stamp)))
+        self.pending_saves.add(task)
+        task.add_done_callback(self._save_done)
+    
+    def _save_done(self, task: asyncio.Task):
+        self.pending_saves.discard(task)
+        # Once a batch of background inserts has drained, nothing is appending to the WAL, so it is
+        # compacted down to the artifacts that still aren't in MongoDB instead of growing for the process lifetime
+        if ARTIFACT_WAL_PATH and not self.pending_saves:
+            try:
+                self._rewrite_wal(self.failed_saves)
+            except OSError as e:
+                logger.error(f"Artifact WAL compaction failed: {str(e)}")
+    
+    async def _write_behind(self, doc: dict) -> bool:
+        """True once the artifact is in MongoDB; on failure the doc is kept in failed_saves"""
+        try:
+            if ARTIFACT_WAL_PATH:
+                await asyncio.to_thread(self._append_wal, doc)
+            await durable_artifacts.insert_one(doc)
+            return True
+        except Exception as e:
+            logger.error(f"Background artifact save failed: {str(e)}")
+            self.failed_saves.append(doc)
+            return False
+    
+    @staticmethod
+    def _append_wal(doc: dict):
+        with open(ARTIFACT_WAL_PATH, "ab") as wal:
+            wal.write(orjson.dumps(doc) + b"\n")
+    
+    @staticmethod
+    def _rewrite_wal(docs: List[dict]):
+        """Replace the WAL with just these docs; an empty list truncates it"""
+        tmp_path = f"{ARTIFACT_WAL_PATH}.tmp"
+        with open(tmp_path, "wb") as wal:
+            wal.writelines(orjson.dumps(doc) + b"\n" for doc in docs)
+        os.replace(tmp_path, ARTIFACT_WAL_PATH)
+    
+    async def flush_saves(self):
+        await asyncio.gather(*self.pending_saves, return_exceptions=True)
+        if ARTIFACT_WAL_PATH:
+            # Only artifacts that never reached MongoDB stay logged, so the next startup replays them
+            if self.failed_saves:
+                logger.warning(f"Keeping {len(self.failed_saves)} unsaved artifacts in {ARTIFACT_WAL_PATH}")
+            self._rewrite_wal(self.failed_saves)
+    
+    async def replay_wal(self):
+        """Upsert artifacts logged by a process that exited before its background saves finished"""
+        if not ARTIFACT_WAL_PATH or not os.path.exists(ARTIFACT_WAL_PATH):
+            return
+        with open(ARTIFACT_WAL_PATH, "rb") as wal:
+            docs = [orjson.loads(line) for line in wal if line.strip()]
+        for doc in docs:
+            doc["created_at"] = datetime.fromisoformat(doc["created_at"])
+            await durable_artifacts.replace_one({"id": doc["id"]}, doc, upsert=True)
+        open(ARTIFACT_WAL_PATH, "wb").close()
+        if docs:
+            logger.info(f"Replayed {len(docs)} artifacts from {ARTIFACT_WAL_PATH}")
+
+async def send_orjson(websocket: WebSocket, payload: dict):
+    """Text frame encoded with orjson; binary frames on these sockets carry audio or artifact chunks"""
+    await websocket.send_text(orjson.dumps(payload).decode())
+
+class WorkflowChannel:
+    """Outbound frame queue for one workflow WebSocket, drained by a dedicated writer task
+    
+    Frames that queue up while a send is in flight are coalesced into a single
+    {"type": "batch", "events": [...]} message, encoded with orjson. Bytes frames
+    (artifact chunks) are sent as-is, in order, between the JSON messages.
+    
+    The queue is bounded: when a slow client lets it fill, agent_token deltas are
+    merged per agent until there is room again, and every other frame waits.
+    """
+    
+    def __init__(self, websocket: WebSocket):
+        self.websocket = websocket
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=WS_QUEUE_MAX_FRAMES)
+        self.writer: Optional[asyncio.Task] = None
+        self.heartbeat: Optional[asyncio.Task] = None
+        self.closed = False
+        self._overflow: Dict[str, str] = {}
+    
+    def start(self):
+        self.writer = asyncio.create_task(self._drain())
+        self.heartbeat = asyncio.create_task(self._ping())
+    
+    async def send(self, frame: dict | bytes):
+        if self.closed:
+            return
+        if isinstance(frame, dict) and frame.get("type") == "agent_token" and self.queue.full():
+            role = frame["agent_role"]
+            self._overflow[role] = self._overflow.get(role, "") + frame["delta"]
+            return
+        if self._overflow:
+            await self._flush_overflow()
+        await self.queue.put(frame)
+    
+    async def _flush_overflow(self):
+        overflow, self._overflow = self._overflow, {}
+        for role, delta in overflow.items():
+            await self.queue.put({"type": "agent_token", "agent_role": role, "delta": delta})
+    
+    async def _ping(self):
+        while not self.closed:
+            await asyncio.sleep(WS_HEARTBEAT_SECONDS)
+            await self.send({"type": "ping"})
+    
+    async def _send_frames(self, frames: List[dict]):
+        payload = frames[0] if len(frames) == 1 else {"type": "batch", "events": frames}
+        await send_orjson(self.websocket, payload)
+    
+    async def _collect(self) -> list:
+        """Take the next batch; only a trailing agent_token lingers, every other frame is a flush boundary"""
+        loop = asyncio.get_running_loop()
+        items = [await self.queue.get()]
+        deadline = loop.time() + WS_BATCH_LINGER_SECONDS
+        while len(items) < WS_BATCH_MAX_FRAMES:
+            if not self.queue.empty():
+                items.append(self.queue.get_nowait())
+                continue
+            last = items[-1]
+            remaining = deadline - loop.time()
+            if not (isinstance(last, dict) and last.get("type") == "agent_token") or remaining <= 0:
+                break
+            try:
+                items.append(await asyncio.wait_for(self.queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return items
+    
+    async def _drain(self):
+        try:
+            while True:
+                items = await self._collect()
+                
+                frames: List[dict] = []
+                for item in items:
+                    if isinstance(item, dict):
+                        frames.append(item)
+                        continue
+                    if frames:
+                        await self._send_frames(frames)
+                        frames = []
+                    if item is None:
+                        return
+                    await self.websocket.send_bytes(item)
+                if frames:
+                    await self._send_frames(frames)
+        except Exception as e:
+            logger.info(f"WebSocket writer stopped: {str(e)}")
+        finally:
+            # Release producers blocked on a full queue; later sends are dropped
+            self.closed = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+    
+    async def close(self):
+        """Flush queued frames, then stop the writer"""
+        if self.heartbeat:
+            self.heartbeat.cancel()
+        if self.writer:
+            if not self.closed:
+                if self._overflow:
+                    await self._flush_overflow()
+                await self.queue.put(None)
+            await self.writer
+        self.closed = True
 
 orchestrator = EnhancedAgentOrchestrator(GEMINI_API_KEY)
 
@@ -440,7 +1160,8 @@ if ENABLE_OPENAI_REALTIME and EMERGENT_LLM_KEY:
 
 if ENABLE_GEMINI_LIVE and GEMINI_API_KEY and GEMINI_AVAILABLE:
     logger.info("Initializing Google Gemini Live API")
-    gemini_client = genai.Client(api_key=GEMINI_API_KEY)
+    # Share the text agents' client so both paths reuse one set of HTTP connections
+    gemini_client = orchestrator.gemini_client
 
 # Create realtime router
 realtime_router = APIRouter()
@@ -494,7 +1215,7 @@ async def gemini_live_websocket(websocket: WebSocket):
                         
                         elif "text" in message:
                             # Control messages from client
-                            data = json.loads(message["text"])
+                            data = orjson.loads(message["text"])
                             if data.get("type") == "end_turn":
                                 await session.send(input="", end_of_turn=True)
                             elif data.get("type") == "text_message":
@@ -519,18 +1240,18 @@ async def gemini_live_websocket(websocket: WebSocket):
                                         await websocket.send_bytes(part.inline_data.data)
                                     elif part.text:
                                         # Text response from Gemini
-                                        await websocket.send_json({
+                                        await send_orjson(websocket, {
                                             "type": "transcript",
                                             "role": "assistant",
                                             "text": part.text
                                         })
                             
                             if response.server_content.turn_complete:
-                                await websocket.send_json({"type": "turn_complete"})
+                                await send_orjson(websocket, {"type": "turn_complete"})
                         
                         # Handle function calls if tools are configured
                         if response.tool_call:
-                            await websocket.send_json({
+                            await send_orjson(websocket, {
                                 "type": "tool_call",
                                 "tool_call": str(response.tool_call)
                             })
@@ -548,7 +1269,7 @@ async def gemini_live_websocket(websocket: WebSocket):
     except Exception as e:
         logger.error(f"Gemini Live WebSocket error: {str(e)}")
         try:
-            await websocket.send_json({"type": "error", "message": str(e)})
+            await send_orjson(websocket, {"type": "error", "message": str(e)})
         except:
             pass
     finally:
@@ -573,89 +1294,93 @@ async def get_realtime_config():
 
 # ==================== API ROUTES ====================
 
+async def request_time() -> datetime:
+    """One clock read per request, shared by every document it writes (async so FastAPI skips the threadpool)"""
+    return utc_now()
+
 @api_router.get("/")
 async def root():
     return {"message": "AICOE Genesis API - Enhanced with ADK principles", "status": "active"}
 
 @api_router.post("/projects", response_model=Project)
-async def create_project(input: ProjectCreate):
+async def create_project(input: ProjectCreate, now: datetime = Depends(request_time)):
     project = Project(
         name=input.name,
         description=input.description,
-        mode=input.mode
+        mode=input.mode,
+        created_at=now,
+        updated_at=now
     )
-    doc = project.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
-    doc['updated_at'] = doc['updated_at'].isoformat()
-    await db.projects.insert_one(doc)
+    await durable_projects.insert_one(project.model_dump())
     return project
 
 @api_router.get("/projects", response_model=List[Project])
 async def get_projects():
-    projects = await db.projects.find({}, {"_id": 0}).to_list(1000)
-    for proj in projects:
-        if isinstance(proj['created_at'], str):
-            proj['created_at'] = datetime.fromisoformat(proj['created_at'])
-        if isinstance(proj['updated_at'], str):
-            proj['updated_at'] = datetime.fromisoformat(proj['updated_at'])
-    return projects
+    cursor = db.projects.find({}, PROJECT_PROJECTION).sort("created_at", 1).limit(MAX_LIST_RESULTS).batch_size(LIST_BATCH_SIZE)
+    return validated_json(PROJECT_LIST_ADAPTER, [doc async for doc in cursor])
 
 @api_router.get("/projects/{project_id}", response_model=Project)
 async def get_project(project_id: str):
-    project = await db.projects.find_one({"id": project_id}, {"_id": 0})
+    project = await db.projects.find_one({"id": project_id}, PROJECT_PROJECTION)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
-    if isinstance(project['created_at'], str):
-        project['created_at'] = datetime.fromisoformat(project['created_at'])
-    if isinstance(project['updated_at'], str):
-        project['updated_at'] = datetime.fromisoformat(project['updated_at'])
-    return project
+    return validated_json(PROJECT_ADAPTER, project)
 
 @api_router.get("/projects/{project_id}/artifacts", response_model=List[Artifact])
 async def get_project_artifacts(project_id: str):
-    artifacts = await db.artifacts.find({"project_id": project_id}, {"_id": 0}).to_list(1000)
-    for art in artifacts:
-        if isinstance(art['created_at'], str):
-            art['created_at'] = datetime.fromisoformat(art['created_at'])
-    return artifacts
+    cursor = db.artifacts.find({"project_id": project_id}, ARTIFACT_PROJECTION).sort("created_at", 1).limit(MAX_LIST_RESULTS).batch_size(LIST_BATCH_SIZE)
+    return validated_json(ARTIFACT_LIST_ADAPTER, [doc async for doc in cursor])
 
 @api_router.get("/projects/{project_id}/messages", response_model=List[AgentMessage])
 async def get_project_messages(project_id: str):
-    messages = await db.agent_messages.find({"project_id": project_id}, {"_id": 0}).to_list(1000)
-    for msg in messages:
-        if isinstance(msg.get('timestamp'), str):
-            msg['timestamp'] = datetime.fromisoformat(msg['timestamp'])
-    return messages
+    cursor = db.agent_messages.find({"project_id": project_id}, MESSAGE_PROJECTION).sort("timestamp", 1).limit(MAX_LIST_RESULTS).batch_size(LIST_BATCH_SIZE)
+    return validated_json(MESSAGE_LIST_ADAPTER, [doc async for doc in cursor])
 
 @api_router.websocket("/ws/workflow/{project_id}")
 async def workflow_websocket(websocket: WebSocket, project_id: str):
     await websocket.accept()
     logger.info(f"WebSocket connected for project {project_id}")
+    channel = WorkflowChannel(websocket)
+    channel.start()
+    # The workflow runs as its own task so this loop keeps reading and notices a disconnect straight away
+    workflow: Optional[asyncio.Task] = None
     
     try:
         while True:
-            data = await websocket.receive_json()
+            data = orjson.loads(await websocket.receive_text())
             action = data.get("action")
             
             if action == "start_workflow":
                 brief = data.get("brief")
                 if not brief:
-                    await websocket.send_json({"type": "error", "message": "Brief is required"})
+                    await channel.send({"type": "error", "message": "Brief is required"})
+                    continue
+                if workflow and not workflow.done():
+                    await channel.send({"type": "error", "message": "A workflow is already running"})
                     continue
                 
-                await orchestrator.process_workflow(project_id, brief, websocket)
+                workflow = asyncio.create_task(run_workflow(project_id, brief, channel))
             
     except WebSocketDisconnect:
         logger.info(f"WebSocket disconnected for project {project_id}")
     except Exception as e:
         logger.error(f"WebSocket error: {str(e)}")
-        try:
-            await websocket.send_json({"type": "error", "message": str(e)})
-        except:
-            pass
+        await channel.send({"type": "error", "message": str(e)})
+    finally:
+        if workflow and not workflow.done():
+            workflow.cancel()
+            await asyncio.gather(workflow, return_exceptions=True)
+        await channel.close()
+
+async def run_workflow(project_id: str, brief: str, channel: WorkflowChannel):
+    try:
+        await asyncio.wait_for(orchestrator.process_workflow(project_id, brief, channel), timeout=WORKFLOW_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        logger.error(f"Workflow for project {project_id} timed out after {WORKFLOW_TIMEOUT_SECONDS}s")
+        await channel.send({"type": "error", "message": "Workflow timed out"})
 
 @api_router.post("/voice/generate-artifact")
-async def generate_artifact(data: dict):
+async def generate_artifact(data: dict, now: datetime = Depends(request_time)):
     artifact_type = data.get("artifact_type")
     context = data.get("context")
     project_id = data.get("project_id")
@@ -668,19 +1393,33 @@ async def generate_artifact(data: dict):
     if not agent_role:
         raise HTTPException(status_code=400, detail="Invalid artifact type")
     
-    _, content = await orchestrator.run_agent(agent_role, context, project_id)
+    if data.get("stream"):
+        return StreamingResponse(
+            stream_artifact(agent_role, artifact_type, context, project_id), media_type="application/x-ndjson"
+        )
+    
+    _, content = await orchestrator.run_agent(agent_role, context, project_id, AgentScheduler.BACKGROUND)
     
     if artifact_type == "prototype":
-        if content.startswith("```"):
-            content = content.split("\n", 1)[1]
-        if content.endswith("```"):
-            content = content.rsplit("\n", 1)[0]
-        content = content.strip()
+        content = _strip_fences(content)
     
-    await orchestrator.save_artifact(project_id, artifact_type, content)
+    orchestrator.save_artifact_later(project_id, artifact_type, content, now)
     
     return {"success": True, "artifact_type": artifact_type, "content": content}
 
+async def stream_artifact(agent_role: str, artifact_type: str, context: str, project_id: str) -> AsyncIterator[bytes]:
+    """NDJSON variant of generate_artifact: agent_token lines as Gemini streams, then one artifact_ready line"""
+    chunks = []
+    async for delta in orchestrator.stream_agent(agent_role, context, project_id, AgentScheduler.BACKGROUND):
+        chunks.append(delta)
+        yield orjson.dumps({"type": "agent_token", "agent_role": agent_role, "delta": delta}) + b"\n"
+    
+    content = "".join(chunks)
+    if artifact_type == "prototype":
+        content = _strip_fences(content)
+    orchestrator.save_artifact_later(project_id, artifact_type, content)
+    yield orjson.dumps({"type": "artifact_ready", "artifact_type": artifact_type, "content": content}) + b"\n"
+
 app.include_router(api_router)
 app.include_router(realtime_router, prefix="/api")
 
@@ -692,6 +1431,65 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.on_event("startup")
+async def configure_event_loop():
+    # Background DB writes and cache fills start synchronously up to their first real await (Python 3.12+)
+    if hasattr(asyncio, "eager_task_factory"):
+        asyncio.get_running_loop().set_task_factory(asyncio.eager_task_factory)
+
+@app.on_event("startup")
+async def create_indexes():
+    await db.projects.create_index("id", unique=True)
+    await db.projects.create_index([("created_at", -1)])
+    await db.artifacts.create_index([("project_id", 1), ("created_at", -1)])
+    await db.agent_messages.create_index([("project_id", 1), ("timestamp", 1)])
+    await db.response_cache.create_index("key", unique=True)
+    await db.response_cache.create_index("created_at", expireAfterSeconds=RESPONSE_CACHE_TTL_SECONDS)
+    await db.semantic_cache.create_index([("agent_role", 1), ("scope", 1), ("created_at", -1)])
+    await db.semantic_cache.create_index("created_at", expireAfterSeconds=RESPONSE_CACHE_TTL_SECONDS)
+
+ISO_TIMESTAMP_MIGRATION = "iso_timestamps_to_bson_dates"
+
+@app.on_event("startup")
+async def migrate_iso_timestamps():
+    # Rows written before timestamps were stored as BSON dates; strings would sort apart from dates.
+    # New rows are always written as dates, so this runs once per database and is then skipped
+    if await db.migrations.find_one({"id": ISO_TIMESTAMP_MIGRATION}):
+        return
+    for collection, fields in ((db.projects, ("created_at", "updated_at")),
+                               (db.artifacts, ("created_at",)),
+                               (db.agent_messages, ("timestamp",))):
+        for field in fields:
+            result = await collection.update_many(
+                {field: {"$type": "string"}},
+                [{"$set": {field: {"$toDate": f"${field}"}}}]
+            )
+            if result.modified_count:
+                logger.info(f"Converted {result.modified_count} {collection.name}.{field} values to BSON dates")
+    await db.migrations.update_one(
+        {"id": ISO_TIMESTAMP_MIGRATION},
+        {"$set": {"completed_at": utc_now()}},
+        upsert=True
+    )
+
+@app.on_event("startup")
+async def replay_artifact_wal():
+    await orchestrator.replay_wal()
+
+@app.on_event("startup")
+async def warm_prompt_caches():
+    orchestrator.cache_warmer = asyncio.create_task(orchestrator.keep_prompt_caches_warm())
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
-    client.close()
+    if orchestrator.cache_warmer:
+        orchestrator.cache_warmer.cancel()
+    await orchestrator.flush_saves()
+    await client.close()
+    log_listener.stop()
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host="0.0.0.0", port=int(os.environ.get("PORT", "8001")), loop="uvloop", http="httptools", ws="websockets",
+                # Large artifacts are compressed by the app; per-message deflate would only add CPU to small frames
+                ws_per_message_deflate=False)
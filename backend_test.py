@@ -5,18 +5,45 @@ Comprehensive testing for all backend APIs and functionality
 """
 
 import asyncio
-import json
-import requests
+import orjson
+import httpx
 import websockets
-import time
+from collections import Counter
 from datetime import datetime
 import os
+import sys
+import zlib
+from urllib.parse import urlsplit, urlunsplit
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv('/app/frontend/.env')
 BACKEND_URL = os.getenv('REACT_APP_BACKEND_URL', 'https://gemini-fixer.preview.emergentagent.com')
 API_BASE = f"{BACKEND_URL}/api"
+_api_parts = urlsplit(API_BASE)
+WS_BASE = urlunsplit(_api_parts._replace(scheme='wss' if _api_parts.scheme == 'https' else 'ws'))
+GEMINI_LIVE_URL = f"{WS_BASE}/gemini/live"
+
+# Request bodies are fixed for the whole run; the project payload is serialized once
+PROJECT_PAYLOAD = orjson.dumps({
+    "name": "AICOE Test Project",
+    "description": "A comprehensive test project for AICOE Genesis platform",
+    "mode": "text"
+})
+ARTIFACT_CASES = (
+    ("vision", "I want to build a modern e-commerce platform with AI-powered recommendations"),
+    ("usecases", "Create use cases for a social media management dashboard"),
+    ("prototype", "Build a React component for a user profile management system"),
+)
+
+# Substring markers for the workflow drain's token fast path
+TYPE_MARKER = '"type":"'
+TOKEN_MARKER = '"type":"agent_token"'
+BATCH_PREFIX = '{"type":"batch"'
+
+def preview(payload):
+    """Bounded repr of a decoded response for failure messages"""
+    return repr(payload)[:512]
 
 print(f"🔧 Testing Backend URL: {API_BASE}")
 print(f"⏰ Test Started: {datetime.now()}")
@@ -24,64 +51,82 @@ print("=" * 80)
 
 class BackendTester:
     def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({
-            'Content-Type': 'application/json',
-            'Accept': 'application/json'
-        })
+        # One multiplexed HTTP/2 connection is reused across every REST test;
+        # the transport retries failed connects (httpx has no status-based retry)
+        self.session = httpx.AsyncClient(
+            base_url=API_BASE,
+            headers={'Content-Type': 'application/json', 'Accept': 'application/json'},
+            timeout=httpx.Timeout(120, connect=10),
+            transport=httpx.AsyncHTTPTransport(
+                http2=True,
+                retries=2,
+                limits=httpx.Limits(max_keepalive_connections=8, keepalive_expiry=60),
+            ),
+        )
         self.test_project_id = None
         self.results = {
             'passed': 0,
             'failed': 0,
             'errors': []
         }
+        # Result blocks are buffered and written once per phase, so concurrent tests don't interleave
+        self.verbose = os.getenv("AICOE_TEST_VERBOSE", "1") == "1"
+        self._output = []
+
+    def _flush(self):
+        """Write buffered result lines in a single call"""
+        if self._output:
+            sys.stdout.write("".join(self._output))
+            sys.stdout.flush()
+            self._output.clear()
 
     def log_result(self, test_name, success, message="", error_details=""):
         """Log test results"""
         status = "✅ PASS" if success else "❌ FAIL"
-        print(f"{status} {test_name}")
-        if message:
-            print(f"    📝 {message}")
+        self._output.append(f"{status} {test_name}\n")
+        if self.verbose:
+            if message:
+                self._output.append(f"    📝 {message}\n")
+            if error_details:
+                self._output.append(f"    🚨 Error: {error_details}\n")
         if error_details:
-            print(f"    🚨 Error: {error_details}")
             self.results['errors'].append(f"{test_name}: {error_details}")
         
         if success:
             self.results['passed'] += 1
         else:
             self.results['failed'] += 1
-        print()
+        self._output.append("\n")
+
+    async def _send_batch(self, ws, messages):
+        """Send JSON messages as text frames without a loop hop per send"""
+        await asyncio.gather(*(ws.send(orjson.dumps(m).decode()) for m in messages))
 
-    def test_health_check(self):
+    async def test_health_check(self):
         """Test 1: Basic API Health Check"""
         print("🔍 Test 1: API Health Check")
         try:
-            response = self.session.get(f"{API_BASE}/")
+            response = await self.session.get("/")
             if response.status_code == 200:
                 data = response.json()
                 if 'message' in data and 'status' in data:
                     self.log_result("Health Check", True, f"Status: {data.get('status')}, Message: {data.get('message')}")
                     return True
                 else:
-                    self.log_result("Health Check", False, "Missing required fields in response", str(data))
+                    self.log_result("Health Check", False, "Missing required fields in response", preview(data))
             else:
                 self.log_result("Health Check", False, f"HTTP {response.status_code}", response.text)
         except Exception as e:
             self.log_result("Health Check", False, "Connection failed", str(e))
         return False
 
-    def test_project_management(self):
+    async def test_project_management(self):
         """Test 2: Project Management APIs"""
         print("🔍 Test 2: Project Management")
         
         # Test 2a: Create Project
         try:
-            project_data = {
-                "name": "AICOE Test Project",
-                "description": "A comprehensive test project for AICOE Genesis platform",
-                "mode": "text"
-            }
-            response = self.session.post(f"{API_BASE}/projects", json=project_data)
+            response = await self.session.post("/projects", content=PROJECT_PAYLOAD)
             
             if response.status_code == 200:
                 project = response.json()
@@ -89,7 +134,7 @@ class BackendTester:
                     self.test_project_id = project['id']
                     self.log_result("Create Project", True, f"Project ID: {self.test_project_id}")
                 else:
-                    self.log_result("Create Project", False, "Missing required fields", str(project))
+                    self.log_result("Create Project", False, "Missing required fields", preview(project))
                     return False
             else:
                 self.log_result("Create Project", False, f"HTTP {response.status_code}", response.text)
@@ -98,43 +143,51 @@ class BackendTester:
             self.log_result("Create Project", False, "Request failed", str(e))
             return False
 
+        # Test 2b/2c only depend on the new id, so both GETs go out as concurrent HTTP/2 streams
+        list_response, get_response = await asyncio.gather(
+            self.session.get("/projects"),
+            self.session.get(f"/projects/{self.test_project_id}"),
+            return_exceptions=True,
+        )
+
         # Test 2b: List Projects
         try:
-            response = self.session.get(f"{API_BASE}/projects")
-            if response.status_code == 200:
-                projects = response.json()
+            if isinstance(list_response, Exception):
+                raise list_response
+            if list_response.status_code == 200:
+                projects = list_response.json()
                 if isinstance(projects, list) and len(projects) > 0:
                     self.log_result("List Projects", True, f"Found {len(projects)} projects")
                 else:
-                    self.log_result("List Projects", False, "No projects returned or invalid format", str(projects))
+                    self.log_result("List Projects", False, "No projects returned or invalid format", preview(projects))
             else:
-                self.log_result("List Projects", False, f"HTTP {response.status_code}", response.text)
+                self.log_result("List Projects", False, f"HTTP {list_response.status_code}", list_response.text)
         except Exception as e:
             self.log_result("List Projects", False, "Request failed", str(e))
 
         # Test 2c: Get Specific Project
-        if self.test_project_id:
-            try:
-                response = self.session.get(f"{API_BASE}/projects/{self.test_project_id}")
-                if response.status_code == 200:
-                    project = response.json()
-                    if project.get('id') == self.test_project_id:
-                        self.log_result("Get Project by ID", True, f"Retrieved project: {project.get('name')}")
-                    else:
-                        self.log_result("Get Project by ID", False, "Project ID mismatch", str(project))
+        try:
+            if isinstance(get_response, Exception):
+                raise get_response
+            if get_response.status_code == 200:
+                project = get_response.json()
+                if project.get('id') == self.test_project_id:
+                    self.log_result("Get Project by ID", True, f"Retrieved project: {project.get('name')}")
                 else:
-                    self.log_result("Get Project by ID", False, f"HTTP {response.status_code}", response.text)
-            except Exception as e:
-                self.log_result("Get Project by ID", False, "Request failed", str(e))
+                    self.log_result("Get Project by ID", False, "Project ID mismatch", preview(project))
+            else:
+                self.log_result("Get Project by ID", False, f"HTTP {get_response.status_code}", get_response.text)
+        except Exception as e:
+            self.log_result("Get Project by ID", False, "Request failed", str(e))
 
         return True
 
-    def test_realtime_config(self):
+    async def test_realtime_config(self):
         """Test 3: Realtime Configuration Endpoint"""
         print("🔍 Test 3: Realtime Configuration")
         
         try:
-            response = self.session.get(f"{API_BASE}/realtime/config")
+            response = await self.session.get("/realtime/config")
             if response.status_code == 200:
                 config = response.json()
                 required_fields = ['provider', 'openai_enabled', 'gemini_enabled', 'available_providers']
@@ -147,26 +200,26 @@ class BackendTester:
                                   f"Provider: {config['provider']}, OpenAI: {openai_status}, Gemini: {gemini_status}")
                     return config
                 else:
-                    self.log_result("Realtime Configuration", False, "Missing required fields", str(config))
+                    self.log_result("Realtime Configuration", False, "Missing required fields", preview(config))
             else:
                 self.log_result("Realtime Configuration", False, f"HTTP {response.status_code}", response.text)
         except Exception as e:
             self.log_result("Realtime Configuration", False, "Request failed", str(e))
         return None
 
-    def test_openai_realtime_endpoints(self):
+    async def test_openai_realtime_endpoints(self):
         """Test 4: OpenAI Realtime Voice API Endpoints"""
         print("🔍 Test 4: OpenAI Realtime API")
         
         # Test 4a: Create Realtime Session
         try:
-            response = self.session.post(f"{API_BASE}/realtime/session")
+            response = await self.session.post("/realtime/session")
             if response.status_code == 200:
                 session_data = response.json()
                 if 'client_secret' in session_data:
                     self.log_result("OpenAI Session Creation", True, "Session token received")
                 else:
-                    self.log_result("OpenAI Session Creation", False, "No client_secret in response", str(session_data))
+                    self.log_result("OpenAI Session Creation", False, "No client_secret in response", preview(session_data))
             else:
                 self.log_result("OpenAI Session Creation", False, f"HTTP {response.status_code}", response.text)
         except Exception as e:
@@ -174,15 +227,14 @@ class BackendTester:
 
         # Test 4b: SDP Negotiation Endpoint
         try:
-            # This endpoint expects SDP offer, so we'll just check if it responds properly to empty request
-            response = self.session.post(f"{API_BASE}/realtime/negotiate", json={})
-            # We expect this to fail with 400 or similar, but not 404
-            if response.status_code in [400, 422]:  # Bad request is expected without proper SDP
-                self.log_result("OpenAI SDP Negotiate", True, f"Endpoint accessible (HTTP {response.status_code})")
-            elif response.status_code == 404:
+            # Reachability probe only: OPTIONS needs no SDP body, and a 405 still proves the route exists
+            response = await self.session.options("/realtime/negotiate")
+            if response.status_code == 404:
                 self.log_result("OpenAI SDP Negotiate", False, "Endpoint not found", response.text)
+            elif response.status_code < 500:
+                self.log_result("OpenAI SDP Negotiate", True, f"Endpoint accessible (HTTP {response.status_code})")
             else:
-                self.log_result("OpenAI SDP Negotiate", True, f"Endpoint responds (HTTP {response.status_code})")
+                self.log_result("OpenAI SDP Negotiate", False, f"HTTP {response.status_code}", response.text)
         except Exception as e:
             self.log_result("OpenAI SDP Negotiate", False, "Request failed", str(e))
 
@@ -191,14 +243,12 @@ class BackendTester:
         print("🔍 Test 5: Gemini Live WebSocket")
         
         try:
-            # Convert HTTP URL to WebSocket URL
-            ws_url = API_BASE.replace('https://', 'wss://').replace('http://', 'ws://')
-            ws_endpoint = f"{ws_url}/gemini/live"
+            ws_endpoint = GEMINI_LIVE_URL
             
             print(f"    🔗 Connecting to: {ws_endpoint}")
             
             # Test WebSocket connection
-            async with websockets.connect(ws_endpoint) as websocket:
+            async with websockets.connect(ws_endpoint, max_queue=1024, max_size=2**22, compression=None) as websocket:
                 print("    ✅ WebSocket connection established")
                 
                 # Send a test text message
@@ -207,20 +257,21 @@ class BackendTester:
                     "message": "Hello, this is a test message for Gemini Live API"
                 }
                 
-                await websocket.send(json.dumps(test_message))
+                await self._send_batch(websocket, [test_message])
                 print("    📤 Sent test message")
                 
                 # Wait for response (with timeout)
                 try:
-                    response = await asyncio.wait_for(websocket.recv(), timeout=10)
-                    data = json.loads(response)
+                    async with asyncio.timeout(10):
+                        response = await websocket.recv()
+                except TimeoutError:
+                    self.log_result("Gemini WebSocket Connection", True, "Connection successful (no immediate response)")
+                else:
+                    data = orjson.loads(response)
                     print(f"    📨 Received response type: {data.get('type', 'unknown')}")
                     
                     self.log_result("Gemini WebSocket Connection", True, "Connection and message exchange successful")
                     
-                except asyncio.TimeoutError:
-                    self.log_result("Gemini WebSocket Connection", True, "Connection successful (no immediate response)")
-                    
         except websockets.exceptions.ConnectionClosed as e:
             if e.code == 1008:  # Policy violation - API not enabled
                 self.log_result("Gemini WebSocket Connection", False, "Gemini Live API not enabled", f"Code: {e.code}")
@@ -229,7 +280,7 @@ class BackendTester:
         except Exception as e:
             self.log_result("Gemini WebSocket Connection", False, "Connection failed", str(e))
 
-    def test_artifact_generation(self):
+    async def test_artifact_generation(self):
         """Test 6: Artifact Generation (Voice Mode)"""
         print("🔍 Test 6: Artifact Generation")
         
@@ -237,14 +288,7 @@ class BackendTester:
             self.log_result("Artifact Generation", False, "No test project available", "Create project first")
             return
 
-        # Test different artifact types
-        artifact_types = [
-            ("vision", "I want to build a modern e-commerce platform with AI-powered recommendations"),
-            ("usecases", "Create use cases for a social media management dashboard"),
-            ("prototype", "Build a React component for a user profile management system")
-        ]
-
-        for artifact_type, context in artifact_types:
+        for artifact_type, context in ARTIFACT_CASES:
             try:
                 artifact_data = {
                     "project_id": self.test_project_id,
@@ -252,7 +296,7 @@ class BackendTester:
                     "context": context
                 }
                 
-                response = self.session.post(f"{API_BASE}/voice/generate-artifact", json=artifact_data)
+                response = await self.session.post("/voice/generate-artifact", json=artifact_data)
                 
                 if response.status_code == 200:
                     result = response.json()
@@ -262,7 +306,7 @@ class BackendTester:
                                       f"{artifact_type.title()} generated ({content_length} chars)")
                     else:
                         self.log_result(f"Artifact Generation ({artifact_type})", False, 
-                                      "Invalid response format", str(result))
+                                      "Invalid response format", preview(result))
                 else:
                     self.log_result(f"Artifact Generation ({artifact_type})", False, 
                                   f"HTTP {response.status_code}", response.text)
@@ -278,78 +322,96 @@ class BackendTester:
             return
 
         try:
-            # Convert HTTP URL to WebSocket URL
-            ws_url = API_BASE.replace('https://', 'wss://').replace('http://', 'ws://')
-            ws_endpoint = f"{ws_url}/ws/workflow/{self.test_project_id}"
+            ws_endpoint = f"{WS_BASE}/ws/workflow/{self.test_project_id}"
             
             print(f"    🔗 Connecting to: {ws_endpoint}")
             
-            async with websockets.connect(ws_endpoint) as websocket:
+            async with websockets.connect(ws_endpoint, max_queue=1024, max_size=2**22, compression=None) as websocket:
                 # Send workflow start message
                 start_message = {
                     "action": "start_workflow",
                     "brief": "Create a modern fitness tracking application with social features and AI-powered workout recommendations"
                 }
                 
-                await websocket.send(json.dumps(start_message))
+                await self._send_batch(websocket, [start_message])
                 print("    📤 Sent workflow start message")
                 
                 # Collect messages for up to 3 minutes (increased for comprehensive testing)
-                messages_received = []
-                workflow_complete = False
-                start_time = time.time()
+                type_counts = Counter()
                 timeout = 180  # 3 minutes
                 agents_completed = set()
                 
-                while time.time() - start_time < timeout and not workflow_complete:
-                    try:
-                        message = await asyncio.wait_for(websocket.recv(), timeout=15)
-                        data = json.loads(message)
-                        messages_received.append(data)
+                async def drain():
+                    """Consume frames until workflow_complete; returns the error frame if the workflow fails"""
+                    artifact_chunks = []
+                    async for message in websocket:
+                        if isinstance(message, bytes):
+                            artifact_chunks.append(message)
+                            continue
+                        # Token-only frames drive no control flow; count them without parsing.
+                        # orjson's compact output means '"type":"' only ever matches a real key
+                        tokens = message.count(TOKEN_MARKER)
+                        if tokens and message.count(TYPE_MARKER) == tokens + message.startswith(BATCH_PREFIX):
+                            type_counts['agent_token'] += tokens
+                            continue
+                        frame = orjson.loads(message)
+                        events = frame['events'] if frame.get('type') == 'batch' else [frame]
                         
-                        msg_type = data.get('type')
-                        print(f"    📨 Received: {msg_type}")
-                        
-                        if msg_type == 'agent_status' and data.get('status') == 'completed':
-                            agents_completed.add(data.get('agent_role'))
-                            print(f"    ✅ Agent {data.get('agent_role')} completed")
-                        
-                        if msg_type == 'workflow_complete':
-                            workflow_complete = True
-                            break
-                        elif msg_type == 'error':
-                            self.log_result("WebSocket Workflow", False, "Workflow error", data.get('message', 'Unknown error'))
-                            return
+                        for data in events:
+                            if data.get('type') == 'artifact_end':
+                                # Large artifacts arrive as zlib-compressed binary chunks; rebuild the artifact_ready frame
+                                data = {'type': 'artifact_ready', 'artifact_type': data.get('artifact_type'),
+                                        'content': zlib.decompress(b''.join(artifact_chunks)).decode()}
+                                artifact_chunks = []
+                            msg_type = data.get('type')
+                            type_counts[msg_type] += 1
+                            print(f"    📨 Received: {msg_type}")
+                            
+                            if msg_type == 'agent_status' and data.get('status') == 'completed':
+                                agents_completed.add(data.get('agent_role'))
+                                print(f"    ✅ Agent {data.get('agent_role')} completed")
+                            elif msg_type == 'stage_transition':
+                                agents_completed.add(data.get('from'))
+                                print(f"    ✅ Agent {data.get('from')} completed, handing off to {data.get('to')}")
                             
-                    except asyncio.TimeoutError:
-                        print("    ⏱️  Waiting for more messages...")
-                        continue
-                    except Exception as e:
-                        self.log_result("WebSocket Workflow", False, "Message processing error", str(e))
-                        return
+                            if msg_type == 'workflow_complete':
+                                return None
+                            elif msg_type == 'error':
+                                return data
+                    raise ConnectionError("Socket closed before workflow_complete")
                 
-                # Analyze results
-                if workflow_complete:
-                    agent_messages = [m for m in messages_received if m.get('type') == 'agent_message']
-                    artifacts = [m for m in messages_received if m.get('type') == 'artifact_ready']
-                    expected_agents = {'pm', 'ba', 'ux', 'ui'}
-                    
-                    success_msg = f"Workflow completed! {len(agent_messages)} messages, {len(artifacts)} artifacts"
-                    if agents_completed == expected_agents:
-                        success_msg += f", All 4 agents completed: {sorted(agents_completed)}"
-                    else:
-                        success_msg += f", Agents completed: {sorted(agents_completed)}"
-                    
-                    self.log_result("WebSocket Workflow", True, success_msg)
-                else:
+                # One deadline for the whole run instead of a fresh timer per recv
+                try:
+                    async with asyncio.timeout(timeout):
+                        error = await drain()
+                except TimeoutError:
                     self.log_result("WebSocket Workflow", False, 
                                   f"Workflow timeout after {timeout}s", 
-                                  f"Received {len(messages_received)} messages, Agents: {sorted(agents_completed)}")
+                                  f"Received {type_counts.total()} messages, Agents: {sorted(agents_completed)}")
+                    return
+                except Exception as e:
+                    self.log_result("WebSocket Workflow", False, "Message processing error", str(e))
+                    return
+                
+                if error:
+                    self.log_result("WebSocket Workflow", False, "Workflow error", error.get('message', 'Unknown error'))
+                    return
+                
+                # Analyze results
+                expected_agents = {'pm', 'ba', 'ux', 'ui'}
+                
+                success_msg = f"Workflow completed! {type_counts['agent_message']} messages, {type_counts['artifact_ready']} artifacts"
+                if agents_completed == expected_agents:
+                    success_msg += f", All 4 agents completed: {sorted(agents_completed)}"
+                else:
+                    success_msg += f", Agents completed: {sorted(agents_completed)}"
+                
+                self.log_result("WebSocket Workflow", True, success_msg)
                     
         except Exception as e:
             self.log_result("WebSocket Workflow", False, "WebSocket connection failed", str(e))
 
-    def test_crud_operations(self):
+    async def test_crud_operations(self):
         """Test 8: Additional CRUD Operations"""
         print("🔍 Test 8: CRUD Operations")
         
@@ -359,13 +421,13 @@ class BackendTester:
 
         # Test 8a: Get Project Artifacts
         try:
-            response = self.session.get(f"{API_BASE}/projects/{self.test_project_id}/artifacts")
+            response = await self.session.get(f"/projects/{self.test_project_id}/artifacts")
             if response.status_code == 200:
                 artifacts = response.json()
                 if isinstance(artifacts, list):
                     self.log_result("Get Project Artifacts", True, f"Retrieved {len(artifacts)} artifacts")
                 else:
-                    self.log_result("Get Project Artifacts", False, "Invalid response format", str(artifacts))
+                    self.log_result("Get Project Artifacts", False, "Invalid response format", preview(artifacts))
             else:
                 self.log_result("Get Project Artifacts", False, f"HTTP {response.status_code}", response.text)
         except Exception as e:
@@ -373,24 +435,24 @@ class BackendTester:
 
         # Test 8b: Get Project Messages
         try:
-            response = self.session.get(f"{API_BASE}/projects/{self.test_project_id}/messages")
+            response = await self.session.get(f"/projects/{self.test_project_id}/messages")
             if response.status_code == 200:
                 messages = response.json()
                 if isinstance(messages, list):
                     self.log_result("Get Project Messages", True, f"Retrieved {len(messages)} messages")
                 else:
-                    self.log_result("Get Project Messages", False, "Invalid response format", str(messages))
+                    self.log_result("Get Project Messages", False, "Invalid response format", preview(messages))
             else:
                 self.log_result("Get Project Messages", False, f"HTTP {response.status_code}", response.text)
         except Exception as e:
             self.log_result("Get Project Messages", False, "Request failed", str(e))
 
-    def test_gemini_configuration_verification(self):
+    async def test_gemini_configuration_verification(self):
         """Test: Verify Gemini-only configuration"""
         print("🔍 Test: Gemini Configuration Verification")
         
         try:
-            response = self.session.get(f"{API_BASE}/realtime/config")
+            response = await self.session.get("/realtime/config")
             if response.status_code == 200:
                 config = response.json()
                 
@@ -433,36 +495,35 @@ class BackendTester:
         print("🔑 Expected: NO budget limit errors, full 4-agent workflow completion")
         print("=" * 80)
         
-        # Basic health checks first
-        self.test_health_check()
-        gemini_config_ok = self.test_gemini_configuration_verification()
-        
-        # Setup test project for workflow testing
-        self.test_project_management()
+        # Basic health check and the test project first; everything below depends on them
+        await self.test_health_check()
+        await self.test_project_management()
+        self._flush()
         
         # HIGH PRIORITY TESTS - Previously blocked by budget limits
         print("\n🔥 HIGH PRIORITY: Testing Previously Blocked Features")
         print("=" * 50)
-        
-        # 1. Text Mode Multi-Agent Workflow - HIGHEST PRIORITY
         print("🎯 PRIORITY 1: Text Mode Multi-Agent Workflow")
         print("   Previously blocked by: 'Budget has been exceeded! Current cost: 0.418, Max budget: 0.4'")
         print("   Expected: Full PM→BA→UX→UI workflow completion with NO budget errors")
-        await self.test_websocket_workflow()
-        
-        # 2. Artifact Generation Endpoints - HIGHEST PRIORITY  
-        print("\n🎯 PRIORITY 2: Artifact Generation Endpoints")
+        print("🎯 PRIORITY 2: Artifact Generation Endpoints")
         print("   Previously blocked by: HTTP 500 due to same budget limit")
         print("   Expected: All three types (vision, usecases, prototype) working")
-        self.test_artifact_generation()
-        
-        # 3. Gemini Live API - Verify Still Working
-        print("\n🎯 PRIORITY 3: Gemini Live API (Verify Still Working)")
+        print("🎯 PRIORITY 3: Gemini Live API (Verify Still Working)")
         print("   Expected: Voice mode unchanged, should still work")
-        await self.test_gemini_websocket()
         
-        # 4. Additional CRUD verification
-        self.test_crud_operations()
+        # The remaining checks are independent of each other. The long workflow drain starts
+        # first so the REST and Gemini Live checks run during its idle time on the shared client
+        async with asyncio.TaskGroup() as tg:
+            tg.create_task(self.test_websocket_workflow())
+            tg.create_task(self.test_gemini_configuration_verification())
+            tg.create_task(self.test_artifact_generation())
+            tg.create_task(self.test_gemini_websocket())
+        self._flush()
+        
+        # 4. Additional CRUD verification (reads what the workflow persisted)
+        await self.test_crud_operations()
+        self._flush()
         
         # Print focused summary
         print("=" * 80)
@@ -495,8 +556,17 @@ class BackendTester:
 async def main():
     """Main test runner"""
     tester = BackendTester()
-    results = await tester.run_all_tests()
-    return results
+    try:
+        return await tester.run_all_tests()
+    finally:
+        await tester.session.aclose()
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    # uvloop is optional here; fall back to the default loop when it isn't installed
+    try:
+        import uvloop
+        loop_factory = uvloop.new_event_loop
+    except ImportError:
+        loop_factory = None
+    with asyncio.Runner(loop_factory=loop_factory) as runner:
+        runner.run(main())
\ No newline at end of file
@@ -3,18 +3,23 @@
 Comprehensive Backend Test Results - AICOE Genesis Dual Realtime API
 """
 
-import requests
-import json
+import httpx
+import orjson
 import asyncio
 import websockets
 from datetime import datetime
 import os
+import sys
+from collections import deque
+from urllib.parse import urlsplit, urlunsplit
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv('/app/frontend/.env')
 BACKEND_URL = os.getenv('REACT_APP_BACKEND_URL', 'https://gemini-fixer.preview.emergentagent.com')
 API_BASE = f"{BACKEND_URL}/api"
+_api_parts = urlsplit(API_BASE)
+WS_BASE = urlunsplit(_api_parts._replace(scheme='wss' if _api_parts.scheme == 'https' else 'ws'))
 
 print("🚀 COMPREHENSIVE BACKEND TEST RESULTS")
 print("=" * 80)
@@ -22,21 +27,50 @@ print(f"Backend URL: {API_BASE}")
 print(f"Test Time: {datetime.now()}")
 print("=" * 80)
 
+class _OutBuf:
+    """Collects report lines and writes them with a single stdout call"""
+    def __init__(self):
+        self._lines = []
+
+    def log(self, msg=""):
+        self._lines.append(msg)
+
+    def flush(self):
+        if self._lines:
+            sys.stdout.write("\n".join(self._lines) + "\n")
+            sys.stdout.flush()
+            self._lines.clear()
+
 class ComprehensiveTestResults:
     def __init__(self):
+        self._config_task = None
+        self._fixture_project_id = None
+        self._fixture_error = None
+        self._out = _OutBuf()
+        # One multiplexed HTTP/2 connection is shared by every HTTP probe
+        self.session = httpx.AsyncClient(
+            base_url=API_BASE,
+            headers={'Accept': 'application/json'},
+            timeout=httpx.Timeout(120, connect=10),
+            transport=httpx.AsyncHTTPTransport(
+                http2=True,
+                retries=2,
+                limits=httpx.Limits(max_keepalive_connections=20, keepalive_expiry=60),
+            ),
+        )
         self.results = {
-            'working': [],
-            'failed': [],
-            'issues': []
+            'working': deque(),
+            'failed': deque(),
+            'issues': deque()
         }
 
     def log_success(self, test_name, details=""):
         self.results['working'].append(f"✅ {test_name}: {details}")
-        print(f"✅ {test_name}: {details}")
+        self._out.log(f"✅ {test_name}: {details}")
 
     def log_failure(self, test_name, error=""):
         self.results['failed'].append(f"❌ {test_name}: {error}")
-        print(f"❌ {test_name}: {error}")
+        self._out.log(f"❌ {test_name}: {error}")
 
     def log_issue(self, issue):
         self.results['issues'].append(issue)
@@ -44,31 +78,67 @@ class ComprehensiveTestResults:
     async def run_comprehensive_tests(self):
         """Run all comprehensive tests"""
         
-        print("\n🔍 1. REALTIME CONFIGURATION ENDPOINT")
-        await self.test_realtime_config()
-        
-        print("\n🔍 2. OPENAI REALTIME API ENDPOINTS")
-        await self.test_openai_endpoints()
-        
-        print("\n🔍 3. GEMINI LIVE API WEBSOCKET")
-        await self.test_gemini_websocket()
+        # Sections 1-3 share no state, so they run together
+        print("\n🔍 1-3. REALTIME CONFIGURATION, OPENAI REALTIME API ENDPOINTS, GEMINI LIVE API WEBSOCKET")
+        await asyncio.gather(
+            self.test_realtime_config(),
+            self.test_openai_endpoints(),
+            self.test_gemini_websocket(),
+            self.create_fixture_project(),
+        )
+        self._out.flush()
         
         print("\n🔍 4. TEXT MODE MULTI-AGENT SYSTEM")
         await self.test_text_mode_system()
+        self._out.flush()
         
         print("\n🔍 5. CRUD OPERATIONS")
         await self.test_crud_operations()
+        self._out.flush()
         
         print("\n🔍 6. ARTIFACT GENERATION")
         await self.test_artifact_generation()
+        self._out.flush()
         
         # Generate final report
         self.generate_report()
 
+    async def create_fixture_project(self):
+        """Create the one project shared by the workflow, CRUD and artifact sections"""
+        project_data = {
+            "name": "Comprehensive Test Project",
+            "description": "Shared fixture for the comprehensive backend tests",
+            "mode": "text"
+        }
+        try:
+            response = await self.session.post("/projects", json=project_data)
+            if response.status_code == 200:
+                self._fixture_project_id = response.json()['id']
+            else:
+                self._fixture_error = f"HTTP {response.status_code}"
+        except Exception as e:
+            self._fixture_error = str(e)
+
+    def fetch_config(self):
+        """GET /realtime/config once per run; concurrent callers share the same in-flight request"""
+        if self._config_task is None:
+            self._config_task = asyncio.ensure_future(self.session.get("/realtime/config"))
+        return self._config_task
+
+    async def provider_enabled(self, flag):
+        """Provider flag from the shared config, or None when the config couldn't be read"""
+        try:
+            response = await self.fetch_config()
+            if response.status_code == 200:
+                return response.json().get(flag)
+        except Exception:
+            pass
+        return None
+
     async def test_realtime_config(self):
         """Test realtime configuration endpoint"""
         try:
-            response = requests.get(f"{API_BASE}/realtime/config")
+            response = await self.fetch_config()
             if response.status_code == 200:
                 config = response.json()
                 
@@ -92,10 +162,13 @@ class ComprehensiveTestResults:
 
     async def test_openai_endpoints(self):
         """Test OpenAI realtime endpoints"""
+        if await self.provider_enabled('openai_enabled') is False:
+            self.log_issue("OpenAI disabled in realtime config; session and negotiate probes skipped")
+            return
         
         # Test session creation
         try:
-            response = requests.post(f"{API_BASE}/realtime/session")
+            response = await self.session.post("/realtime/session")
             if response.status_code == 200:
                 data = response.json()
                 if 'error' in data:
@@ -114,7 +187,7 @@ class ComprehensiveTestResults:
 
         # Test negotiate endpoint
         try:
-            response = requests.post(f"{API_BASE}/realtime/negotiate", json={})
+            response = await self.session.post("/realtime/negotiate", json={})
             if response.status_code in [200, 400, 422]:  # These are expected responses
                 self.log_success("OpenAI SDP Negotiate", "Endpoint accessible and responding")
             else:
@@ -124,11 +197,14 @@ class ComprehensiveTestResults:
 
     async def test_gemini_websocket(self):
         """Test Gemini Live WebSocket"""
+        if await self.provider_enabled('gemini_enabled') is False:
+            self.log_failure("Gemini WebSocket", "API not enabled or configured")
+            return
+        
         try:
-            ws_url = API_BASE.replace('https://', 'wss://').replace('http://', 'ws://')
-            ws_endpoint = f"{ws_url}/gemini/live"
+            ws_endpoint = f"{WS_BASE}/gemini/live"
             
-            async with websockets.connect(ws_endpoint) as websocket:
+            async with websockets.connect(ws_endpoint, ping_interval=None, compression=None, max_size=2**20) as websocket:
                 self.log_success("Gemini WebSocket Connection", "Connection established successfully")
                 
                 # Test message sending
@@ -137,14 +213,15 @@ class ComprehensiveTestResults:
                     "message": "Hello Gemini, this is a test message"
                 }
                 
-                await websocket.send(json.dumps(test_message))
+                await websocket.send(orjson.dumps(test_message).decode())
                 self.log_success("Gemini Message Sending", "Test message sent successfully")
                 
                 # Try to receive response (with short timeout)
                 try:
-                    response = await asyncio.wait_for(websocket.recv(), timeout=5)
+                    async with asyncio.timeout(5):
+                        response = await websocket.recv()
                     self.log_success("Gemini Response", "Received response from Gemini Live API")
-                except asyncio.TimeoutError:
+                except TimeoutError:
                     self.log_success("Gemini WebSocket", "Connection stable (no immediate response expected)")
                     
         except websockets.exceptions.ConnectionClosed as e:
@@ -157,199 +234,155 @@ class ComprehensiveTestResults:
 
     async def test_text_mode_system(self):
         """Test text mode multi-agent system"""
+        if not self._fixture_project_id:
+            self.log_failure("Text Mode System", "No fixture project available")
+            return
         
-        # First create a project
+        # Test WebSocket workflow (but expect budget limit issue)
         try:
-            project_data = {
-                "name": "Test Multi-Agent Project",
-                "description": "Testing the multi-agent workflow system",
-                "mode": "text"
-            }
-            response = requests.post(f"{API_BASE}/projects", json=project_data)
-            if response.status_code == 200:
-                project = response.json()
-                project_id = project['id']
-                self.log_success("Project Creation for Workflow", f"Project ID: {project_id[:8]}...")
+            ws_endpoint = f"{WS_BASE}/ws/workflow/{self._fixture_project_id}"
+            
+            async with websockets.connect(ws_endpoint, ping_interval=None, compression=None, max_size=2**20) as websocket:
+                self.log_success("WebSocket Connection", "Multi-agent workflow WebSocket connected")
+                
+                # Send workflow start message
+                start_message = {
+                    "action": "start_workflow",
+                    "brief": "Create a simple weather app with location services"
+                }
                 
-                # Test WebSocket workflow (but expect budget limit issue)
+                await websocket.send(orjson.dumps(start_message).decode())
+                self.log_success("Workflow Initiation", "Start message sent successfully")
+                
+                # Listen for initial response
                 try:
-                    ws_url = API_BASE.replace('https://', 'wss://').replace('http://', 'ws://')
-                    ws_endpoint = f"{ws_url}/ws/workflow/{project_id}"
+                    async with asyncio.timeout(10):
+                        message = await websocket.recv()
+                    data = orjson.loads(message)
+                    if data.get('type') == 'batch':
+                        data = data['events'][0]
                     
-                    async with websockets.connect(ws_endpoint) as websocket:
-                        self.log_success("WebSocket Connection", "Multi-agent workflow WebSocket connected")
-                        
-                        # Send workflow start message
-                        start_message = {
-                            "action": "start_workflow",
-                            "brief": "Create a simple weather app with location services"
-                        }
-                        
-                        await websocket.send(json.dumps(start_message))
-                        self.log_success("Workflow Initiation", "Start message sent successfully")
+                    if data.get('type') == 'error':
+                        error_msg = data.get('message', '')
+                        if 'Budget has been exceeded' in error_msg:
+                            self.log_failure("Multi-Agent Workflow", "LLM budget limit exceeded")
+                            self.log_issue("Budget limit reached: Current cost exceeds $0.4 limit")
+                        else:
+                            self.log_failure("Multi-Agent Workflow", error_msg)
+                    else:
+                        self.log_success("Multi-Agent Workflow", f"Received {data.get('type')} message")
                         
-                        # Listen for initial response
-                        try:
-                            message = await asyncio.wait_for(websocket.recv(), timeout=10)
-                            data = json.loads(message)
-                            
-                            if data.get('type') == 'error':
-                                error_msg = data.get('message', '')
-                                if 'Budget has been exceeded' in error_msg:
-                                    self.log_failure("Multi-Agent Workflow", "LLM budget limit exceeded")
-                                    self.log_issue("Budget limit reached: Current cost exceeds $0.4 limit")
-                                else:
-                                    self.log_failure("Multi-Agent Workflow", error_msg)
-                            else:
-                                self.log_success("Multi-Agent Workflow", f"Received {data.get('type')} message")
-                                
-                        except asyncio.TimeoutError:
-                            self.log_success("WebSocket Workflow", "Connection stable, waiting for agent processing")
-                            
-                except Exception as e:
-                    self.log_failure("WebSocket Workflow", str(e))
-            else:
-                self.log_failure("Project Creation for Workflow", f"HTTP {response.status_code}")
+                except TimeoutError:
+                    self.log_success("WebSocket Workflow", "Connection stable, waiting for agent processing")
+                    
         except Exception as e:
-            self.log_failure("Text Mode System", str(e))
+            self.log_failure("WebSocket Workflow", str(e))
 
     async def test_crud_operations(self):
         """Test CRUD operations"""
-        project_id = None
-        
-        # Create project
-        try:
-            project_data = {
-                "name": "CRUD Test Project",
-                "description": "Testing CRUD operations",
-                "mode": "text"
-            }
-            response = requests.post(f"{API_BASE}/projects", json=project_data)
-            if response.status_code == 200:
-                project = response.json()
-                project_id = project['id']
-                self.log_success("Create Project", f"Project created with ID: {project_id[:8]}...")
-            else:
-                self.log_failure("Create Project", f"HTTP {response.status_code}")
-                return
-        except Exception as e:
-            self.log_failure("Create Project", str(e))
+        # The fixture project was created up front; report that step here
+        project_id = self._fixture_project_id
+        if not project_id:
+            self.log_failure("Create Project", self._fixture_error or "No fixture project available")
             return
+        self.log_success("Create Project", f"Project created with ID: {project_id[:8]}...")
 
-        # List projects
-        try:
-            response = requests.get(f"{API_BASE}/projects")
-            if response.status_code == 200:
-                projects = response.json()
-                self.log_success("List Projects", f"Retrieved {len(projects)} projects")
-            else:
-                self.log_failure("List Projects", f"HTTP {response.status_code}")
-        except Exception as e:
-            self.log_failure("List Projects", str(e))
-
-        # Get specific project
-        try:
-            response = requests.get(f"{API_BASE}/projects/{project_id}")
-            if response.status_code == 200:
-                project = response.json()
-                self.log_success("Get Project by ID", f"Retrieved project: {project.get('name')}")
-            else:
-                self.log_failure("Get Project by ID", f"HTTP {response.status_code}")
-        except Exception as e:
-            self.log_failure("Get Project by ID", str(e))
-
-        # Get project artifacts
-        try:
-            response = requests.get(f"{API_BASE}/projects/{project_id}/artifacts")
-            if response.status_code == 200:
-                artifacts = response.json()
-                self.log_success("Get Project Artifacts", f"Retrieved {len(artifacts)} artifacts")
-            else:
-                self.log_failure("Get Project Artifacts", f"HTTP {response.status_code}")
-        except Exception as e:
-            self.log_failure("Get Project Artifacts", str(e))
-
-        # Get project messages
-        try:
-            response = requests.get(f"{API_BASE}/projects/{project_id}/messages")
-            if response.status_code == 200:
-                messages = response.json()
-                self.log_success("Get Project Messages", f"Retrieved {len(messages)} messages")
-            else:
-                self.log_failure("Get Project Messages", f"HTTP {response.status_code}")
-        except Exception as e:
-            self.log_failure("Get Project Messages", str(e))
+        # The four reads only need the new id, so they go out as concurrent HTTP/2 streams
+        responses = await asyncio.gather(
+            self.session.get("/projects"),
+            self.session.get(f"/projects/{project_id}"),
+            self.session.get(f"/projects/{project_id}/artifacts"),
+            self.session.get(f"/projects/{project_id}/messages"),
+            return_exceptions=True,
+        )
+        checks = (
+            ("List Projects", lambda body: f"Retrieved {len(body)} projects"),
+            ("Get Project by ID", lambda body: f"Retrieved project: {body.get('name')}"),
+            ("Get Project Artifacts", lambda body: f"Retrieved {len(body)} artifacts"),
+            ("Get Project Messages", lambda body: f"Retrieved {len(body)} messages"),
+        )
+        for (test_name, describe), response in zip(checks, responses):
+            try:
+                if isinstance(response, Exception):
+                    raise response
+                if response.status_code == 200:
+                    self.log_success(test_name, describe(response.json()))
+                else:
+                    self.log_failure(test_name, f"HTTP {response.status_code}")
+            except Exception as e:
+                self.log_failure(test_name, str(e))
 
     async def test_artifact_generation(self):
         """Test artifact generation endpoint"""
+        if not self._fixture_project_id:
+            self.log_failure("Artifact Generation Setup", "Could not create test project")
+            return
         
-        # Create a project first
         try:
-            project_data = {
-                "name": "Artifact Test Project",
-                "description": "Testing artifact generation",
-                "mode": "voice"
+            # Test artifact generation (expect budget limit)
+            artifact_data = {
+                "project_id": self._fixture_project_id,
+                "artifact_type": "vision",
+                "context": "Create a simple calculator app with basic arithmetic operations"
             }
-            response = requests.post(f"{API_BASE}/projects", json=project_data)
+            
+            response = await self.session.post("/voice/generate-artifact", json=artifact_data)
             if response.status_code == 200:
-                project = response.json()
-                project_id = project['id']
-                
-                # Test artifact generation (expect budget limit)
-                artifact_data = {
-                    "project_id": project_id,
-                    "artifact_type": "vision",
-                    "context": "Create a simple calculator app with basic arithmetic operations"
-                }
-                
-                response = requests.post(f"{API_BASE}/voice/generate-artifact", json=artifact_data)
-                if response.status_code == 200:
-                    result = response.json()
-                    if result.get('success'):
-                        self.log_success("Artifact Generation", f"Generated {artifact_data['artifact_type']} artifact")
-                    else:
-                        self.log_failure("Artifact Generation", "Invalid response format")
-                elif response.status_code == 500:
-                    self.log_failure("Artifact Generation", "Budget limit exceeded (expected)")
-                    self.log_issue("Artifact generation blocked by LLM budget limit")
+                result = response.json()
+                if result.get('success'):
+                    self.log_success("Artifact Generation", f"Generated {artifact_data['artifact_type']} artifact")
                 else:
-                    self.log_failure("Artifact Generation", f"HTTP {response.status_code}")
+                    self.log_failure("Artifact Generation", "Invalid response format")
+            elif response.status_code == 500:
+                self.log_failure("Artifact Generation", "Budget limit exceeded (expected)")
+                self.log_issue("Artifact generation blocked by LLM budget limit")
             else:
-                self.log_failure("Artifact Generation Setup", "Could not create test project")
+                self.log_failure("Artifact Generation", f"HTTP {response.status_code}")
         except Exception as e:
             self.log_failure("Artifact Generation", str(e))
 
     def generate_report(self):
         """Generate comprehensive test report"""
-        print("\n" + "=" * 80)
-        print("📊 COMPREHENSIVE TEST REPORT")
-        print("=" * 80)
+        self._out.log("\n" + "=" * 80)
+        self._out.log("📊 COMPREHENSIVE TEST REPORT")
+        self._out.log("=" * 80)
         
-        print(f"\n✅ WORKING FEATURES ({len(self.results['working'])})")
+        self._out.log(f"\n✅ WORKING FEATURES ({len(self.results['working'])})")
         for item in self.results['working']:
-            print(f"  {item}")
+            self._out.log(f"  {item}")
         
-        print(f"\n❌ FAILED FEATURES ({len(self.results['failed'])})")
+        self._out.log(f"\n❌ FAILED FEATURES ({len(self.results['failed'])})")
         for item in self.results['failed']:
-            print(f"  {item}")
+            self._out.log(f"  {item}")
         
-        print(f"\n⚠️  IDENTIFIED ISSUES ({len(self.results['issues'])})")
+        self._out.log(f"\n⚠️  IDENTIFIED ISSUES ({len(self.results['issues'])})")
         for item in self.results['issues']:
-            print(f"  • {item}")
+            self._out.log(f"  • {item}")
         
         # Calculate success rate
         total_tests = len(self.results['working']) + len(self.results['failed'])
         if total_tests > 0:
             success_rate = (len(self.results['working']) / total_tests) * 100
-            print(f"\n📈 SUCCESS RATE: {success_rate:.1f}% ({len(self.results['working'])}/{total_tests})")
+            self._out.log(f"\n📈 SUCCESS RATE: {success_rate:.1f}% ({len(self.results['working'])}/{total_tests})")
         
-        print(f"\n⏰ Test Completed: {datetime.now()}")
-        print("=" * 80)
+        self._out.log(f"\n⏰ Test Completed: {datetime.now()}")
+        self._out.log("=" * 80)
+        self._out.flush()
 
 async def main():
     """Run comprehensive tests"""
     tester = ComprehensiveTestResults()
-    await tester.run_comprehensive_tests()
+    try:
+        await tester.run_comprehensive_tests()
+    finally:
+        await tester.session.aclose()
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    # uvloop is optional here; fall back to the default loop when it isn't installed
+    try:
+        import uvloop
+        loop_factory = uvloop.new_event_loop
+    except ImportError:
+        loop_factory = None
+    with asyncio.Runner(loop_factory=loop_factory) as runner:
+        runner.run(main())
\ No newline at end of file
@@ -4,9 +4,15 @@ Final Backend Test - Comprehensive verification of all working components
 """
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
 import os
+import sys
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from functools import partial
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -14,34 +20,93 @@ load_dotenv('/app/frontend/.env')
 BACKEND_URL = os.getenv('REACT_APP_BACKEND_URL', 'https://gemini-fixer.preview.emergentagent.com')
 API_BASE = f"{BACKEND_URL}/api"
 
+_HEADERS = {
+    'Content-Type': 'application/json',
+    'Accept': 'application/json'
+}
+
+# Project payloads for the tests that create their own project
+_CRUD_PROJECT = {
+    "name": "Final Test Project",
+    "description": "Comprehensive backend testing project",
+    "mode": "text"
+}
+_ARTIFACT_PROJECT = {
+    "name": "Artifact Test Project",
+    "description": "Testing artifact generation",
+    "mode": "voice"
+}
+_MONGODB_PROJECT = {
+    "name": "MongoDB Test Project",
+    "description": "Testing database integration",
+    "mode": "text"
+}
+
 print(f"🔧 Final Backend Test - URL: {API_BASE}")
 print(f"⏰ Started: {datetime.now()}")
 print("=" * 80)
 
+class _OutBuf:
+    """Collects report lines and writes them with a single stdout call"""
+    def __init__(self):
+        self._lines = []
+
+    def log(self, msg=""):
+        self._lines.append(msg)
+
+    def flush(self):
+        if self._lines:
+            sys.stdout.write("\n".join(self._lines) + "\n")
+            sys.stdout.flush()
+            self._lines.clear()
+
 class FinalTester:
     def __init__(self):
         self.session = requests.Session()
-        self.session.headers.update({
-            'Content-Type': 'application/json',
-            'Accept': 'application/json'
-        })
-        self.results = []
-
-    def test_and_log(self, test_name, test_func):
-        """Run test and log result"""
+        # Transient gateway errors on the preview backend are retried with backoff instead of failing the test.
+        # Status and read retries are GET-only: a 504 on a POST usually means the backend is still working,
+        # and repeating it would create duplicate projects or extra LLM calls. urllib3 still retries connect
+        # errors for every method, since those requests never reached the server.
+        retry = Retry(
+            total=3,
+            backoff_factor=0.3,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset(['GET']),
+        )
+        self.session.mount("https://", HTTPAdapter(max_retries=retry, pool_maxsize=20))
+        self.session.headers.update(_HEADERS)
+        self.results = deque()
+        self._out = _OutBuf()
+        # Test table is bound once; project payloads are supplied via partial
+        self._tests = [
+            ("API Health Check", self.test_health_check),
+            ("Project CRUD Operations", partial(self.test_project_crud, project_data=_CRUD_PROJECT)),
+            ("Realtime API Endpoints", self.test_realtime_endpoints),
+            ("Artifact Generation", partial(self.test_artifact_generation, project_data=_ARTIFACT_PROJECT)),
+            ("MongoDB Integration", partial(self.test_mongodb_integration, project_data=_MONGODB_PROJECT)),
+        ]
+
+    def _safe_run(self, test_func):
+        """Run one test and return (success, message, exception) without raising"""
         try:
             success, message = test_func()
-            status = "✅ PASS" if success else "❌ FAIL"
-            print(f"{status} {test_name}")
-            if message:
-                print(f"    📝 {message}")
-            self.results.append((test_name, success, message))
-            return success
+            return success, message, None
         except Exception as e:
-            print(f"❌ FAIL {test_name}")
-            print(f"    🚨 Exception: {str(e)}")
-            self.results.append((test_name, False, f"Exception: {str(e)}"))
+            return False, None, e
+
+    def log_outcome(self, test_name, success, message, error):
+        """Log one test outcome"""
+        if error is not None:
+            self._out.log(f"❌ FAIL {test_name}")
+            self._out.log(f"    🚨 Exception: {str(error)}")
+            self.results.append((test_name, False, f"Exception: {str(error)}"))
             return False
+        status = "✅ PASS" if success else "❌ FAIL"
+        self._out.log(f"{status} {test_name}")
+        if message:
+            self._out.log(f"    📝 {message}")
+        self.results.append((test_name, success, message))
+        return success
 
     def test_health_check(self):
         """Test API health"""
@@ -51,14 +116,9 @@ class FinalTester:
             return True, f"Status: {data.get('status')}"
         return False, f"HTTP {response.status_code}"
 
-    def test_project_crud(self):
+    def test_project_crud(self, project_data):
         """Test project CRUD operations"""
         # Create project
-        project_data = {
-            "name": "Final Test Project",
-            "description": "Comprehensive backend testing project",
-            "mode": "text"
-        }
         response = self.session.post(f"{API_BASE}/projects", json=project_data)
         if response.status_code != 200:
             return False, f"Create failed: HTTP {response.status_code}"
@@ -97,14 +157,9 @@ class FinalTester:
         
         return True, "Session endpoint working"
 
-    def test_artifact_generation(self):
+    def test_artifact_generation(self, project_data):
         """Test artifact generation"""
         # First create a project
-        project_data = {
-            "name": "Artifact Test Project",
-            "description": "Testing artifact generation",
-            "mode": "voice"
-        }
         response = self.session.post(f"{API_BASE}/projects", json=project_data)
         if response.status_code != 200:
             return False, "Could not create test project"
@@ -129,14 +184,9 @@ class FinalTester:
         
         return False, "Invalid response format"
 
-    def test_mongodb_integration(self):
+    def test_mongodb_integration(self, project_data):
         """Test MongoDB data persistence"""
         # Create a project and verify it's stored
-        project_data = {
-            "name": "MongoDB Test Project",
-            "description": "Testing database integration",
-            "mode": "text"
-        }
         response = self.session.post(f"{API_BASE}/projects", json=project_data)
         if response.status_code != 200:
             return False, "Could not create project"
@@ -159,35 +209,35 @@ class FinalTester:
         print("🚀 Running Final Backend Tests")
         print()
         
-        tests = [
-            ("API Health Check", self.test_health_check),
-            ("Project CRUD Operations", self.test_project_crud),
-            ("Realtime API Endpoints", self.test_realtime_endpoints),
-            ("Artifact Generation", self.test_artifact_generation),
-            ("MongoDB Integration", self.test_mongodb_integration),
-        ]
+        tests = self._tests
         
         passed = 0
         total = len(tests)
         
-        for test_name, test_func in tests:
-            if self.test_and_log(test_name, test_func):
+        # The tests are independent network waits (each makes its own project), so they run
+        # on a thread pool; outcomes are logged afterwards in the original order
+        with ThreadPoolExecutor(max_workers=total) as executor:
+            outcomes = list(executor.map(lambda test: self._safe_run(test[1]), tests))
+        
+        for (test_name, _), outcome in zip(tests, outcomes):
+            if self.log_outcome(test_name, *outcome):
                 passed += 1
-            print()
+            self._out.log()
         
         # Summary
-        print("=" * 80)
-        print("📊 FINAL TEST SUMMARY")
-        print(f"✅ Passed: {passed}/{total}")
-        print(f"❌ Failed: {total - passed}/{total}")
-        print(f"📈 Success Rate: {(passed/total*100):.1f}%")
+        self._out.log("=" * 80)
+        self._out.log("📊 FINAL TEST SUMMARY")
+        self._out.log(f"✅ Passed: {passed}/{total}")
+        self._out.log(f"❌ Failed: {total - passed}/{total}")
+        self._out.log(f"📈 Success Rate: {(passed/total*100):.1f}%")
         
-        print("\n📋 DETAILED RESULTS:")
+        self._out.log("\n📋 DETAILED RESULTS:")
         for test_name, success, message in self.results:
             status = "✅" if success else "❌"
-            print(f"  {status} {test_name}: {message}")
+            self._out.log(f"  {status} {test_name}: {message}")
         
-        print(f"\n⏰ Completed: {datetime.now()}")
+        self._out.log(f"\n⏰ Completed: {datetime.now()}")
+        self._out.flush()
         
         return passed, total
 
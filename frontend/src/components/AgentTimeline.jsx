@@ -2,7 +2,7 @@ import React, { useEffect, useRef } from 'react';
 import { ScrollArea } from '@/components/ui/scroll-area';
 import { CheckCircle, Circle, Loader2, ArrowRight, Sparkles } from 'lucide-react';
 
-const AgentTimeline = ({ agentStates, agentMessages }) => {
+const AgentTimeline = ({ agentStates, agentMessages, streamingMessages = {} }) => {
   const scrollRef = useRef(null);
   const agents = [
     { role: 'pm', name: 'Alex', title: 'Project Manager', color: 'blue', emoji: '🎯' },
@@ -18,7 +18,7 @@ const AgentTimeline = ({ agentStates, agentMessages }) => {
         behavior: 'smooth'
       });
     }
-  }, [agentMessages, agentStates]);
+  }, [agentMessages, agentStates, streamingMessages]);
 
   const getStatusIcon = (status) => {
     switch (status) {
@@ -56,6 +56,7 @@ const AgentTimeline = ({ agentStates, agentMessages }) => {
       <div className="p-6 space-y-6">
         {agents.map((agent, index) => {
           const messages = agentMessages.filter(m => m.role === agent.role);
+          const streamingText = streamingMessages[agent.role];
           const status = agentStates[agent.role];
           const isActive = status === 'in_progress';
           const isCompleted = status === 'completed';
@@ -124,7 +125,7 @@ const AgentTimeline = ({ agentStates, agentMessages }) => {
                 </div>
 
                 {/* Messages */}
-                {messages.length > 0 && (
+                {(messages.length > 0 || streamingText) && (
                   <div className="p-5 space-y-3 bg-slate-50/50">
                     {messages.map((msg, idx) => (
                       <div
@@ -148,6 +149,17 @@ const AgentTimeline = ({ agentStates, agentMessages }) => {
                         </div>
                       </div>
                     ))}
+                    {streamingText && (
+                      <div
+                        className="bg-white rounded-xl p-4 border-l-4 shadow-sm"
+                        style={{ borderLeftColor: `var(--${agent.color}-500)` }}
+                        data-testid={`agent-streaming-${agent.role}`}
+                      >
+                        <div className="text-sm text-slate-800 leading-relaxed whitespace-pre-wrap break-words">
+                          {streamingText}
+                        </div>
+                      </div>
+                    )}
                   </div>
                 )}
               </div>
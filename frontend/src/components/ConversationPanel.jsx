@@ -30,8 +30,10 @@ const ConversationPanel = ({
     ui: 'pending'
   });
   const [agentMessages, setAgentMessages] = useState([]);
+  const [streamingMessages, setStreamingMessages] = useState({});
   const [websocket, setWebsocket] = useState(null);
   const [aiStatus, setAiStatus] = useState('idle');
+  const artifactTransfer = useRef(null);
 
   const handleStartProject = async () => {
     if (!projectBrief.trim()) {
@@ -50,6 +52,7 @@ const ConversationPanel = ({
       onProjectStart(project);
 
       const ws = new WebSocket(`${WS_URL}/api/ws/workflow/${project.id}`);
+      ws.binaryType = 'arraybuffer';
 
       ws.onopen = () => {
         console.log('WebSocket connected');
@@ -61,8 +64,15 @@ const ConversationPanel = ({
       };
 
       ws.onmessage = (event) => {
+        // Binary frames carry chunks of a large artifact announced by artifact_begin
+        if (event.data instanceof ArrayBuffer) {
+          artifactTransfer.current?.chunks.push(new Uint8Array(event.data));
+          return;
+        }
         const data = JSON.parse(event.data);
-        handleWebSocketMessage(data);
+        // The backend coalesces frames that queue up together into a single batch
+        const events = data.type === 'batch' ? data.events : [data];
+        events.forEach(handleWebSocketMessage);
       };
 
       ws.onerror = (error) => {
@@ -93,7 +103,18 @@ const ConversationPanel = ({
         }
         break;
 
+      case 'agent_token':
+        setStreamingMessages(prev => ({
+          ...prev,
+          [data.agent_role]: (prev[data.agent_role] || '') + data.delta
+        }));
+        break;
+
       case 'agent_message':
+        setStreamingMessages(prev => {
+          const { [data.agent_role]: _, ...rest } = prev;
+          return rest;
+        });
         setAgentMessages(prev => [...prev, {
           role: data.agent_role,
           name: data.agent_name,
@@ -102,7 +123,13 @@ const ConversationPanel = ({
         }]);
         break;
 
-      case 'handoff':
+      case 'stage_transition':
+        setAgentStates(prev => ({
+          ...prev,
+          [data.from]: data.from_status,
+          [data.to]: data.to_status
+        }));
+        setAiStatus('working');
         break;
 
       case 'artifact_ready':
@@ -112,7 +139,27 @@ const ConversationPanel = ({
         });
         break;
 
+      case 'artifact_begin':
+        artifactTransfer.current = { type: data.artifact_type, encoding: data.encoding, chunks: [] };
+        break;
+
+      case 'artifact_end': {
+        const transfer = artifactTransfer.current;
+        artifactTransfer.current = null;
+        if (!transfer) break;
+        let stream = new Blob(transfer.chunks).stream();
+        if (transfer.encoding === 'deflate') {
+          stream = stream.pipeThrough(new DecompressionStream('deflate'));
+        }
+        new Response(stream).text().then(content => onArtifactReady({
+          type: transfer.type,
+          content
+        }));
+        break;
+      }
+
       case 'workflow_complete':
+        setStreamingMessages({});
         setAiStatus('idle');
         onWorkflowComplete();
         break;
@@ -191,6 +238,7 @@ const ConversationPanel = ({
               <AgentTimeline
                 agentStates={agentStates}
                 agentMessages={agentMessages}
+                streamingMessages={streamingMessages}
               />
             )}
           </div>
@@ -4,67 +4,73 @@ Simple Gemini WebSocket Test
 """
 
 import asyncio
-import json
+import orjson
 import websockets
 import os
-from dotenv import load_dotenv
 
-# Load environment variables
-load_dotenv('/app/frontend/.env')
-BACKEND_URL = os.getenv('REACT_APP_BACKEND_URL', 'https://gemini-fixer.preview.emergentagent.com')
+# /gemini/live treats binary frames as audio, so the test message is encoded once as a text frame
+TEST_MESSAGE_FRAME = orjson.dumps({"type": "text_message", "message": "Hello Gemini, can you hear me?"}).decode()
 
 async def test_gemini_websocket():
     """Test Gemini WebSocket with proper handling"""
     
+    # Read at call time so importing this module doesn't depend on the .env having been loaded
+    backend_url = os.environ.get('REACT_APP_BACKEND_URL', 'https://gemini-fixer.preview.emergentagent.com')
+    
     # Convert HTTP URL to WebSocket URL
-    ws_url = BACKEND_URL.replace('https://', 'wss://').replace('http://', 'ws://')
+    ws_url = backend_url.replace('https://', 'wss://').replace('http://', 'ws://')
     ws_endpoint = f"{ws_url}/api/gemini/live"
     
     print(f"🔗 Connecting to: {ws_endpoint}")
     
     try:
-        async with websockets.connect(ws_endpoint) as websocket:
+        async with websockets.connect(ws_endpoint, compression=None, max_size=2**20, ping_interval=30, ping_timeout=60, close_timeout=5) as websocket:
             print("✅ WebSocket connection established")
             
             # Send a simple text message
-            test_message = {
-                "type": "text_message",
-                "message": "Hello Gemini, can you hear me?"
-            }
-            
-            await websocket.send(json.dumps(test_message))
+            await websocket.send(TEST_MESSAGE_FRAME)
             print("📤 Sent test message")
             
-            # Wait for responses
+            # Wait for responses. One receiver task stays pending across quiet periods, so a
+            # heartbeat timeout only counts a missed beat instead of cancelling and restarting recv()
             timeout_count = 0
             max_timeouts = 3
+            recv_task = None
             
-            while timeout_count < max_timeouts:
-                try:
-                    # Try to receive message with timeout
-                    message = await asyncio.wait_for(websocket.recv(), timeout=5)
-                    
-                    # Handle different message types
-                    if isinstance(message, str):
-                        # Text message
-                        try:
-                            data = json.loads(message)
-                            print(f"📨 Received JSON: {data}")
-                        except json.JSONDecodeError:
-                            print(f"📨 Received text: {message}")
-                    elif isinstance(message, bytes):
-                        # Binary message (audio data)
-                        print(f"📨 Received binary data: {len(message)} bytes")
-                    
-                    timeout_count = 0  # Reset timeout count on successful receive
-                    
-                except asyncio.TimeoutError:
-                    timeout_count += 1
-                    print(f"⏱️  Timeout {timeout_count}/{max_timeouts}")
-                    
-                except Exception as e:
-                    print(f"❌ Error receiving message: {str(e)}")
-                    break
+            try:
+                while timeout_count < max_timeouts:
+                    try:
+                        if recv_task is None:
+                            recv_task = asyncio.create_task(websocket.recv())
+                        done, _ = await asyncio.wait({recv_task}, timeout=5)
+                        if not done:
+                            timeout_count += 1
+                            print(f"⏱️  Timeout {timeout_count}/{max_timeouts}")
+                            continue
+                        
+                        message = recv_task.result()
+                        recv_task = None
+                        
+                        # Handle different message types
+                        if isinstance(message, str):
+                            # Text message
+                            try:
+                                data = orjson.loads(message)
+                                print(f"📨 Received JSON: {data}")
+                            except orjson.JSONDecodeError:
+                                print(f"📨 Received text: {message}")
+                        elif isinstance(message, bytes):
+                            # Binary message (audio data)
+                            print(f"📨 Received binary data: {len(message)} bytes")
+                        
+                        timeout_count = 0  # Reset timeout count on successful receive
+                        
+                    except Exception as e:
+                        print(f"❌ Error receiving message: {str(e)}")
+                        break
+            finally:
+                if recv_task is not None:
+                    recv_task.cancel()
             
             print("✅ Gemini WebSocket test completed successfully")
             
@@ -76,4 +82,15 @@ async def test_gemini_websocket():
         print(f"❌ WebSocket connection failed: {str(e)}")
 
 if __name__ == "__main__":
-    asyncio.run(test_gemini_websocket())
\ No newline at end of file
+    # Only the script entry point loads the frontend .env; importers skip the dotenv import entirely
+    from dotenv import load_dotenv
+    load_dotenv('/app/frontend/.env')
+    
+    # uvloop is optional here; fall back to the default loop when it isn't installed
+    try:
+        import uvloop
+        loop_factory = uvloop.new_event_loop
+    except ImportError:
+        loop_factory = None
+    with asyncio.Runner(loop_factory=loop_factory) as runner:
+        runner.run(test_gemini_websocket())
\ No newline at end of file
@@ -4,11 +4,55 @@ WebSocket Workflow Test - Focused test for text mode workflow
 """
 
 import asyncio
-import json
+import orjson
+import sys
 import websockets
 import time
+import zlib
+from collections import Counter
 from datetime import datetime
 
+WORKFLOW_BRIEF = "Create a simple todo list app with add, edit, delete, and mark complete functionality"
+# The workflow socket reads with receive_text(), so the start frame is encoded once as text
+START_WORKFLOW_FRAME = orjson.dumps({"action": "start_workflow", "brief": WORKFLOW_BRIEF}).decode()
+
+class _OutBuf:
+    """Collects progress lines and writes them with a single stdout call"""
+    def __init__(self):
+        self._lines = []
+
+    def log(self, msg=""):
+        self._lines.append(msg)
+
+    def flush(self):
+        if self._lines:
+            sys.stdout.write("\n".join(self._lines) + "\n")
+            sys.stdout.flush()
+            self._lines.clear()
+
+_out = _OutBuf()
+
+def _on_agent_status(data, elapsed):
+    _out.log(f"    📊 [{elapsed}s] Agent {data.get('agent_role')}: {data.get('status')}")
+
+def _on_agent_message(data, elapsed):
+    _out.log(f"    💬 [{elapsed}s] Message from {data.get('agent_role')}")
+
+def _on_artifact_ready(data, elapsed):
+    content_len = len(data.get('content', ''))
+    _out.log(f"    📄 [{elapsed}s] Artifact ready: {data.get('artifact_type')} ({content_len} chars)")
+
+def _on_stage_transition(data, elapsed):
+    _out.log(f"    🔄 [{elapsed}s] Handoff: {data.get('from')} → {data.get('to')}")
+
+# Progress frames that are only reported; workflow_complete and error change control flow and stay inline
+PROGRESS_HANDLERS = {
+    'agent_status': _on_agent_status,
+    'agent_message': _on_agent_message,
+    'artifact_ready': _on_artifact_ready,
+    'stage_transition': _on_stage_transition,
+}
+
 async def test_websocket_workflow():
     """Test WebSocket workflow with extended timeout"""
     
@@ -16,91 +60,106 @@ async def test_websocket_workflow():
     project_id = "33d16279-54cd-4460-8c90-e21748716473"
     ws_url = "wss://designgenesis-ai.preview.emergentagent.com/api/ws/workflow/" + project_id
     
-    print(f"🔗 Connecting to: {ws_url}")
+    _out.log(f"🔗 Connecting to: {ws_url}")
     
     try:
-        async with websockets.connect(ws_url) as websocket:
+        # Relaxed keep-alive: a backend busy generating an artifact shouldn't trip a ping timeout mid-run
+        async with websockets.connect(ws_url, compression=None, max_size=2**22, ping_interval=30, ping_timeout=60, close_timeout=5) as websocket:
             # Send workflow start message
-            start_message = {
-                "action": "start_workflow",
-                "brief": "Create a simple todo list app with add, edit, delete, and mark complete functionality"
-            }
-            
-            await websocket.send(json.dumps(start_message))
-            print(f"📤 Sent workflow start message at {datetime.now()}")
+            await websocket.send(START_WORKFLOW_FRAME)
+            _out.log(f"📤 Sent workflow start message at {datetime.now()}")
             
             # Collect messages for up to 5 minutes
-            messages_received = []
+            # Only per-type counts and artifact sizes are reported, so frames aren't retained
+            type_counts = Counter()
+            artifacts = []
             workflow_complete = False
-            start_time = time.time()
+            start_ns = time.monotonic_ns()
+            elapsed = 0
             timeout = 300  # 5 minutes
             
-            while time.time() - start_time < timeout and not workflow_complete:
+            # Binary artifact chunks are inflated as they arrive instead of being kept and joined at artifact_end
+            inflater = zlib.decompressobj()
+            artifact_parts = []
+            # Names used on every frame are bound to locals once, outside the receive loop
+            recv = websocket.recv
+            loads = orjson.loads
+            now_ns = time.monotonic_ns
+            progress_handler = PROGRESS_HANDLERS.get
+            # Progress lines are written at most once per elapsed second rather than once per frame
+            flushed_at = 0
+            while elapsed < timeout and not workflow_complete:
                 try:
-                    message = await asyncio.wait_for(websocket.recv(), timeout=30)
-                    data = json.loads(message)
-                    messages_received.append(data)
+                    async with asyncio.timeout(30):
+                        message = await recv()
+                    # One clock read per received frame, shared by the loop condition and the log lines
+                    elapsed = (now_ns() - start_ns) // 1_000_000_000
+                    if isinstance(message, bytes):
+                        artifact_parts.append(inflater.decompress(message))
+                        continue
+                    frame = loads(message)
+                    events = frame['events'] if frame.get('type') == 'batch' else [frame]
                     
-                    msg_type = data.get('type')
-                    elapsed = int(time.time() - start_time)
+                    for data in events:
+                        msg_type = data.get('type')
+                        if msg_type == 'artifact_end':
+                            # Large artifacts arrive as zlib-compressed binary chunks; rebuild the artifact_ready frame
+                            artifact_parts.append(inflater.flush())
+                            data = {'type': 'artifact_ready', 'artifact_type': data.get('artifact_type'),
+                                    'content': b''.join(artifact_parts).decode()}
+                            inflater = zlib.decompressobj()
+                            artifact_parts = []
+                            msg_type = 'artifact_ready'
+                        type_counts[msg_type] += 1
+                        if msg_type == 'artifact_ready':
+                            artifacts.append((data.get('artifact_type'), len(data.get('content', ''))))
                     
-                    if msg_type == 'agent_status':
-                        agent = data.get('agent_role')
-                        status = data.get('status')
-                        print(f"    📊 [{elapsed}s] Agent {agent}: {status}")
-                    elif msg_type == 'agent_message':
-                        agent = data.get('agent_role')
-                        print(f"    💬 [{elapsed}s] Message from {agent}")
-                    elif msg_type == 'artifact_ready':
-                        artifact_type = data.get('artifact_type')
-                        content_len = len(data.get('content', ''))
-                        print(f"    📄 [{elapsed}s] Artifact ready: {artifact_type} ({content_len} chars)")
-                    elif msg_type == 'handoff':
-                        from_agent = data.get('from_agent')
-                        to_agent = data.get('to_agent')
-                        print(f"    🔄 [{elapsed}s] Handoff: {from_agent} → {to_agent}")
-                    elif msg_type == 'workflow_complete':
-                        print(f"    ✅ [{elapsed}s] Workflow completed!")
-                        workflow_complete = True
-                        break
-                    elif msg_type == 'error':
-                        print(f"    ❌ [{elapsed}s] Error: {data.get('message', 'Unknown error')}")
-                        return False
+                        handler = progress_handler(msg_type)
+                        if handler is not None:
+                            handler(data, elapsed)
+                        elif msg_type == 'workflow_complete':
+                            _out.log(f"    ✅ [{elapsed}s] Workflow completed!")
+                            workflow_complete = True
+                            break
+                        elif msg_type == 'error':
+                            _out.log(f"    ❌ [{elapsed}s] Error: {data.get('message', 'Unknown error')}")
+                            return False
+                    
+                    if elapsed != flushed_at:
+                        _out.flush()
+                        flushed_at = elapsed
                         
-                except asyncio.TimeoutError:
-                    elapsed = int(time.time() - start_time)
-                    print(f"    ⏱️  [{elapsed}s] Waiting for more messages...")
+                except TimeoutError:
+                    elapsed = (now_ns() - start_ns) // 1_000_000_000
+                    _out.log(f"    ⏱️  [{elapsed}s] Waiting for more messages...")
+                    _out.flush()
                     continue
                 except Exception as e:
-                    print(f"    🚨 Message processing error: {str(e)}")
+                    _out.log(f"    🚨 Message processing error: {str(e)}")
                     return False
             
             # Analyze results
             if workflow_complete:
-                agent_messages = [m for m in messages_received if m.get('type') == 'agent_message']
-                artifacts = [m for m in messages_received if m.get('type') == 'artifact_ready']
-                
-                print(f"\n✅ SUCCESS: Workflow completed!")
-                print(f"   📊 Total messages: {len(messages_received)}")
-                print(f"   💬 Agent messages: {len(agent_messages)}")
-                print(f"   📄 Artifacts generated: {len(artifacts)}")
+                _out.log(f"\n✅ SUCCESS: Workflow completed!")
+                _out.log(f"   📊 Total messages: {type_counts.total()}")
+                _out.log(f"   💬 Agent messages: {type_counts['agent_message']}")
+                _out.log(f"   📄 Artifacts generated: {len(artifacts)}")
                 
-                for artifact in artifacts:
-                    artifact_type = artifact.get('artifact_type')
-                    content_len = len(artifact.get('content', ''))
-                    print(f"      - {artifact_type}: {content_len} characters")
+                for artifact_type, content_len in artifacts:
+                    _out.log(f"      - {artifact_type}: {content_len} characters")
                 
                 return True
             else:
-                elapsed = int(time.time() - start_time)
-                print(f"\n⏰ TIMEOUT: Workflow did not complete within {timeout}s")
-                print(f"   📊 Messages received: {len(messages_received)}")
-                print(f"   ⏱️  Elapsed time: {elapsed}s")
+                _out.log(f"\n⏰ TIMEOUT: Workflow did not complete within {timeout}s")
+                _out.log(f"   📊 Messages received: {type_counts.total()}")
+                _out.log(f"   ⏱️  Elapsed time: {elapsed}s")
                 return False
                 
     except Exception as e:
-        print(f"🚨 WebSocket connection failed: {str(e)}")
+        _out.log(f"🚨 WebSocket connection failed: {str(e)}")
         return False
+    finally:
+        _out.flush()
 
 async def main():
     print("🚀 Starting WebSocket Workflow Test")
@@ -114,4 +173,11 @@ async def main():
     print(f"📊 Result: {'SUCCESS' if success else 'FAILED'}")
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    # uvloop is optional here; fall back to the default loop when it isn't installed
+    try:
+        import uvloop
+        loop_factory = uvloop.new_event_loop
+    except ImportError:
+        loop_factory = None
+    with asyncio.Runner(loop_factory=loop_factory) as runner:
+        runner.run(main())
\ No newline at end of file